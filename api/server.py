@@ -1,16 +1,18 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends, Query
+from fastapi import FastAPI, HTTPException, WebSocket, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional, Set
+from typing import List, Dict, Any, Optional, Set, Tuple
 from decimal import Decimal
-import json
 import asyncio
+import orjson
+import time
 from datetime import datetime
 import uuid
 
-from engine.order import Order, OrderType, OrderSide, OrderStatus
+from engine.order import Order, OrderType, OrderSide, OrderStatus, format_timestamp
 from engine.matcher import MatchingEngine, Trade
-from utils.logger import log_api_request, log_order, log_trade
+from utils.logger import api_logger, log_api_request, log_order, log_trade
 
 
 # Pydantic models for API requests and responses
@@ -18,8 +20,8 @@ class OrderRequest(BaseModel):
     symbol: str
     side: str
     order_type: str = Field(..., alias="type")
-    quantity: str
-    price: Optional[str] = None
+    quantity: Decimal  # Parsed by pydantic from a JSON string or number
+    price: Optional[Decimal] = None
     client_order_id: Optional[str] = None
 
     class Config:
@@ -31,7 +33,7 @@ class OrderResponse(BaseModel):
     client_order_id: Optional[str]
     symbol: str
     side: str
-    type: str
+    order_type: str = Field(..., serialization_alias="type")  # Order.to_dict() key, sent as "type"
     quantity: str
     price: Optional[str]
     status: str
@@ -81,36 +83,87 @@ app.add_middleware(
 # Create matching engine instance
 matching_engine = MatchingEngine()
 
+# Maximum number of messages buffered per WebSocket client before the oldest is dropped
+CLIENT_QUEUE_MAXSIZE = 64
+
 # WebSocket connection managers
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Set[WebSocket] = set()
         self.subscriptions: Dict[WebSocket, Set[str]] = {}
+        self.by_symbol: Dict[str, Set[WebSocket]] = {}  # Symbol -> subscribed connections
+        self.wildcards: Set[WebSocket] = set()  # Connections subscribed to every symbol ('*')
+        self.queues: Dict[WebSocket, asyncio.Queue] = {}  # Pending outgoing messages
+        self.senders: Dict[WebSocket, asyncio.Task] = {}  # Task draining each queue
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
         self.subscriptions[websocket] = set()
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_MAXSIZE)
+        self.queues[websocket] = queue
+        self.senders[websocket] = asyncio.create_task(self._sender(websocket, queue))
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        self.active_connections.discard(websocket)
+        self.queues.pop(websocket, None)
+        sender = self.senders.pop(websocket, None)
+        if sender is not None:
+            sender.cancel()
         if websocket in self.subscriptions:
-            del self.subscriptions[websocket]
+            for symbol in self.subscriptions.pop(websocket):
+                self._unindex(websocket, symbol)
 
     def subscribe(self, websocket: WebSocket, symbol: str):
         if websocket in self.subscriptions:
             self.subscriptions[websocket].add(symbol)
+            if symbol == '*':
+                self.wildcards.add(websocket)
+            else:
+                self.by_symbol.setdefault(symbol, set()).add(websocket)
 
     def unsubscribe(self, websocket: WebSocket, symbol: str):
         if websocket in self.subscriptions:
             self.subscriptions[websocket].discard(symbol)
-
-    async def broadcast(self, message: str, symbol: str = None):
-        for connection in self.active_connections:
-            if symbol is None or (connection in self.subscriptions and 
-                                 (symbol in self.subscriptions[connection] or 
-                                  '*' in self.subscriptions[connection])):
-                await connection.send_text(message)
+            self._unindex(websocket, symbol)
+
+    def _unindex(self, websocket: WebSocket, symbol: str):
+        if symbol == '*':
+            self.wildcards.discard(websocket)
+            return
+        subscribers = self.by_symbol.get(symbol)
+        if subscribers is not None:
+            subscribers.discard(websocket)
+            if not subscribers:
+                del self.by_symbol[symbol]
+
+    async def _sender(self, websocket: WebSocket, queue: asyncio.Queue):
+        try:
+            while True:
+                payload = await queue.get()
+                await websocket.send_bytes(payload)
+        except Exception:
+            # Client went away mid-send
+            self.disconnect(websocket)
+
+    def send(self, websocket: WebSocket, payload: bytes):
+        queue = self.queues.get(websocket)
+        if queue is None:
+            return
+        if queue.full():
+            # Slow client: drop its oldest pending message rather than stall everyone else
+            queue.get_nowait()
+        queue.put_nowait(payload)
+
+    def broadcast(self, payload: bytes, symbol: str = None):
+        if symbol is None:
+            subscribers = self.active_connections
+        else:
+            subscribers = self.by_symbol.get(symbol, ())
+            if self.wildcards:
+                subscribers = self.wildcards.union(subscribers)
+        for connection in subscribers:
+            self.send(connection, payload)
 
 
 # Create connection managers for different feeds
@@ -119,45 +172,140 @@ order_book_manager = ConnectionManager()
 bbo_manager = ConnectionManager()
 
 
-# Register trade listener
-async def trade_listener(trade: Trade):
-    trade_data = trade.to_dict()
-    log_trade(trade)
+# Maximum number of trades waiting to be broadcast
+TRADE_QUEUE_MAXSIZE = 10000
+
+# Queue of trades waiting to be broadcast (created on startup)
+trade_queue: Optional[asyncio.Queue] = None
+
+# Long-lived task running broadcast_worker, and the event loop it runs on
+broadcast_task: Optional[asyncio.Task] = None
+broadcast_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+# Serialized snapshots keyed by (feed, symbol), reused until the book version changes.
+# Each is kept as the bytes before and after its timestamp value, so that every
+# payload can be stamped with the time it is sent
+_serialized_snapshots: Dict[Tuple[str, str], Tuple[int, bytes, bytes]] = {}
+
+
+def serialize_snapshot(feed: str, order_book) -> bytes:
+    key = (feed, order_book.symbol)
+    cached = _serialized_snapshots.get(key)
+    if cached is None or cached[0] != order_book.version:
+        data = order_book.get_order_book_snapshot() if feed == "orderbook" else order_book.get_bbo()
+        data["timestamp"] = ""
+        # Quotes inside string values are escaped, so this only matches the key itself
+        head, tail = orjson.dumps(data).split(b'"timestamp":""', 1)
+        cached = (order_book.version, head + b'"timestamp":"', b'"' + tail)
+        _serialized_snapshots[key] = cached
+    return cached[1] + format_timestamp(time.time_ns()).encode() + cached[2]
+
+
+# Book version last broadcast per symbol
+_broadcast_versions: Dict[str, int] = {}
+
+
+# Broadcast a batch of trades
+def trade_listener(trades: List[Trade]):
+    symbols = []
     
-    # Broadcast trade to subscribers
-    await trade_manager.broadcast(json.dumps(trade_data), trade.symbol)
+    # Broadcast each trade to subscribers
+    for trade in trades:
+        log_trade(trade)
+        trade_manager.broadcast(orjson.dumps(trade.to_dict()), trade.symbol)
+        if trade.symbol not in symbols:
+            symbols.append(trade.symbol)
     
-    # Also update order book and BBO after trade
-    symbol = trade.symbol
-    order_book = matching_engine.get_order_book(symbol)
+    # Update order book and BBO once per symbol in the batch
+    for symbol in symbols:
+        order_book = matching_engine.get_order_book(symbol)
+        
+        # Skip books that haven't changed since they were last broadcast
+        if _broadcast_versions.get(symbol) == order_book.version:
+            continue
+        _broadcast_versions[symbol] = order_book.version
+        
+        order_book_manager.broadcast(serialize_snapshot("orderbook", order_book), symbol)
+        bbo_manager.broadcast(serialize_snapshot("bbo", order_book), symbol)
+
+
+# Drain the trade queue and broadcast whatever accumulated since the last batch
+async def broadcast_worker():
+    while True:
+        batch = [await trade_queue.get()]
+        while not trade_queue.empty():
+            batch.append(trade_queue.get_nowait())
+        
+        try:
+            trade_listener(batch)
+        except Exception as e:
+            api_logger.error("Failed to broadcast %d trades: %s", len(batch), e)
+
+
+def enqueue_trades(trades: List[Trade]):
+    for index, trade in enumerate(trades):
+        try:
+            trade_queue.put_nowait(trade)
+        except asyncio.QueueFull:
+            api_logger.warning("Trade queue full, dropping broadcast of %d trades", len(trades) - index)
+            return
+
+
+# Queue each order's trades from the matching engine for the broadcast worker
+def trade_callback(trades: List[Trade]):
+    # Before startup or after shutdown there is no broadcast worker (or subscriber) to feed
+    loop = broadcast_loop
+    if loop is None or loop.is_closed():
+        return
     
-    # Update order book
-    order_book_data = order_book.get_order_book_snapshot()
-    await order_book_manager.broadcast(json.dumps(order_book_data), symbol)
+    # asyncio queues aren't thread-safe, so hop onto the server loop when the
+    # engine is driven from another thread
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
     
-    # Update BBO
-    bbo_data = order_book.get_bbo()
-    await bbo_manager.broadcast(json.dumps(bbo_data), symbol)
+    if running_loop is loop:
+        enqueue_trades(trades)
+    else:
+        loop.call_soon_threadsafe(enqueue_trades, trades)
 
 
-# Convert sync trade listener to async
-def trade_callback(trade: Trade):
-    asyncio.create_task(trade_listener(trade))
+# Register the callback
+matching_engine.add_trade_batch_listener(trade_callback)
 
 
-# Register the callback
-matching_engine.add_trade_listener(trade_callback)
+# Start one broadcast worker for the lifetime of the app instead of a task per trade
+@app.on_event("startup")
+async def start_broadcast_worker():
+    global trade_queue, broadcast_task, broadcast_loop
+    broadcast_loop = asyncio.get_running_loop()
+    trade_queue = asyncio.Queue(maxsize=TRADE_QUEUE_MAXSIZE)
+    broadcast_task = asyncio.create_task(broadcast_worker())
+
+
+@app.on_event("shutdown")
+async def stop_broadcast_worker():
+    global trade_queue, broadcast_task, broadcast_loop
+    task = broadcast_task
+    
+    # Detach first, so trades matched from now on are not sent to a stopping loop
+    trade_queue = broadcast_task = broadcast_loop = None
+    
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
 
 
 # API routes
 @app.post("/api/orders", response_model=OrderResponse)
 async def create_order(order_request: OrderRequest):
     try:
-        log_api_request("POST", "/api/orders", order_request.dict())
-        
-        # Convert string values to appropriate types
-        quantity = Decimal(order_request.quantity)
-        price = Decimal(order_request.price) if order_request.price else None
+        log_api_request("POST", "/api/orders", order_request)
         
         # Map string values to enum types
         try:
@@ -171,8 +319,8 @@ async def create_order(order_request: OrderRequest):
             symbol=order_request.symbol,
             side=order_side,
             order_type=order_type,
-            quantity=quantity,
-            price=price,
+            quantity=order_request.quantity,
+            price=order_request.price,
             client_order_id=order_request.client_order_id
         )
         
@@ -183,31 +331,32 @@ async def create_order(order_request: OrderRequest):
         
         log_order(processed_order, "processed")
         
-        # Convert order to response format
-        response_data = processed_order.to_dict()
-        response_data["type"] = response_data.pop("order_type")
-        
-        return response_data
+        return processed_order.to_dict()
     
     except ValueError as e:
-        log_api_request("POST", "/api/orders", order_request.dict(), "400 - " + str(e))
+        log_api_request("POST", "/api/orders", order_request, "400 - " + str(e))
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        log_api_request("POST", "/api/orders", order_request.dict(), "500 - " + str(e))
+        log_api_request("POST", "/api/orders", order_request, "500 - " + str(e))
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+# Park a WebSocket handler until the client disconnects, discarding client messages
+async def wait_for_disconnect(websocket: WebSocket):
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
 # Add WebSocket endpoints for real-time data
 @app.websocket("/ws/trades/{symbol}")
 async def websocket_trades(websocket: WebSocket, symbol: str):
     await trade_manager.connect(websocket)
     try:
         trade_manager.subscribe(websocket, symbol)
-        while True:
-            # Keep the connection alive and wait for client messages
-            data = await websocket.receive_text()
-            # You could process client messages here if needed
-    except WebSocketDisconnect:
+        await wait_for_disconnect(websocket)
+    finally:
         trade_manager.disconnect(websocket)
 
 @app.websocket("/ws/orderbook/{symbol}")
@@ -217,13 +366,9 @@ async def websocket_orderbook(websocket: WebSocket, symbol: str):
         order_book_manager.subscribe(websocket, symbol)
         # Send initial order book snapshot
         order_book = matching_engine.get_order_book(symbol)
-        order_book_data = order_book.get_order_book_snapshot()
-        await websocket.send_text(json.dumps(order_book_data))
-        
-        while True:
-            # Keep the connection alive and wait for client messages
-            data = await websocket.receive_text()
-    except WebSocketDisconnect:
+        order_book_manager.send(websocket, serialize_snapshot("orderbook", order_book))
+        await wait_for_disconnect(websocket)
+    finally:
         order_book_manager.disconnect(websocket)
 
 @app.websocket("/ws/bbo/{symbol}")
@@ -233,27 +378,34 @@ async def websocket_bbo(websocket: WebSocket, symbol: str):
         bbo_manager.subscribe(websocket, symbol)
         # Send initial BBO
         order_book = matching_engine.get_order_book(symbol)
-        bbo_data = order_book.get_bbo()
-        await websocket.send_text(json.dumps(bbo_data))
-        
-        while True:
-            # Keep the connection alive and wait for client messages
-            data = await websocket.receive_text()
-    except WebSocketDisconnect:
+        bbo_manager.send(websocket, serialize_snapshot("bbo", order_book))
+        await wait_for_disconnect(websocket)
+    finally:
         bbo_manager.disconnect(websocket)
 
 # Add REST endpoints for order book and BBO data
 @app.get("/api/orderbook/{symbol}", response_model=OrderBookResponse)
-async def get_order_book(symbol: str):
+async def get_order_book(symbol: str, depth: Optional[int] = Query(None, ge=1)):
     log_api_request("GET", f"/api/orderbook/{symbol}")
     order_book = matching_engine.get_order_book(symbol)
-    return order_book.get_order_book_snapshot()
+    if depth is not None:
+        # Only the top levels are walked, so a truncated snapshot is cheap to build fresh
+        return Response(orjson.dumps(order_book.get_order_book_snapshot(depth)), media_type="application/json")
+    # Reuse the orjson payload cached for the WebSocket feed, stamped with the current time
+    return Response(serialize_snapshot("orderbook", order_book), media_type="application/json")
+
+@app.get("/api/trades/{symbol}", response_model=List[TradeResponse])
+async def get_trades(symbol: str, limit: int = Query(100, ge=1, le=1000), offset: int = Query(0, ge=0)):
+    log_api_request("GET", f"/api/trades/{symbol}", {"limit": limit, "offset": offset})
+    trades = matching_engine.get_trades(symbol, limit, offset)
+    return Response(orjson.dumps([trade.to_dict() for trade in trades]), media_type="application/json")
 
 @app.get("/api/bbo/{symbol}", response_model=BBOResponse)
 async def get_bbo(symbol: str):
     log_api_request("GET", f"/api/bbo/{symbol}")
     order_book = matching_engine.get_order_book(symbol)
-    return order_book.get_bbo()
+    # Reuse the orjson payload cached for the WebSocket feed, stamped with the current time
+    return Response(serialize_snapshot("bbo", order_book), media_type="application/json")
 
 # Add endpoint to cancel orders
 @app.delete("/api/orders/{order_id}", response_model=OrderResponse)
@@ -269,12 +421,10 @@ async def cancel_order(order_id: str, symbol: str = Query(...)):
         
         log_order(cancelled_order, "cancelled")
         
-        # Convert order to response format
-        response_data = cancelled_order.to_dict()
-        response_data["type"] = response_data.pop("order_type")
-        
-        return response_data
+        return cancelled_order.to_dict()
     
+    except HTTPException:
+        raise
     except Exception as e:
         log_api_request("DELETE", f"/api/orders/{order_id}", {"symbol": symbol}, "500 - " + str(e))
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -292,397 +442,10 @@ if not os.path.exists(static_dir):
 # Mount the static files directory
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
+# Web interface page, read once at import and served from memory
+with open(os.path.join(static_dir, "index.html"), "rb") as index_file:
+    INDEX_HTML = index_file.read()
+
 @app.get("/", response_class=HTMLResponse)
 async def get_web_interface():
-    return """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Cryptocurrency Matching Engine</title>
-        <style>
-            body {
-                font-family: Arial, sans-serif;
-                margin: 0;
-                padding: 20px;
-                background-color: #f5f5f5;
-            }
-            .container {
-                max-width: 1200px;
-                margin: 0 auto;
-                background-color: white;
-                padding: 20px;
-                border-radius: 5px;
-                box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-            }
-            h1, h2 {
-                color: #333;
-            }
-            .section {
-                margin-bottom: 30px;
-                padding: 20px;
-                background-color: #f9f9f9;
-                border-radius: 5px;
-            }
-            .order-form {
-                display: grid;
-                grid-template-columns: 1fr 1fr;
-                gap: 10px;
-            }
-            label {
-                display: block;
-                margin-bottom: 5px;
-                font-weight: bold;
-            }
-            input, select, button {
-                padding: 8px;
-                border: 1px solid #ddd;
-                border-radius: 4px;
-                width: 100%;
-            }
-            button {
-                background-color: #4CAF50;
-                color: white;
-                cursor: pointer;
-                border: none;
-                font-weight: bold;
-            }
-            button:hover {
-                background-color: #45a049;
-            }
-            table {
-                width: 100%;
-                border-collapse: collapse;
-            }
-            th, td {
-                padding: 8px;
-                text-align: left;
-                border-bottom: 1px solid #ddd;
-            }
-            th {
-                background-color: #f2f2f2;
-            }
-            .order-book {
-                display: grid;
-                grid-template-columns: 1fr 1fr;
-                gap: 20px;
-            }
-            .bids, .asks {
-                width: 100%;
-            }
-            .bids th {
-                background-color: rgba(0, 128, 0, 0.1);
-            }
-            .asks th {
-                background-color: rgba(255, 0, 0, 0.1);
-            }
-            #trades {
-                max-height: 300px;
-                overflow-y: auto;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>Cryptocurrency Matching Engine</h1>
-            
-            <div class="section">
-                <h2>Place Order</h2>
-                <form id="orderForm" class="order-form">
-                    <div>
-                        <label for="symbol">Symbol:</label>
-                        <input type="text" id="symbol" name="symbol" value="BTC-USDT" required>
-                    </div>
-                    <div>
-                        <label for="side">Side:</label>
-                        <select id="side" name="side" required>
-                            <option value="buy">Buy</option>
-                            <option value="sell">Sell</option>
-                        </select>
-                    </div>
-                    <div>
-                        <label for="type">Type:</label>
-                        <select id="type" name="type" required>
-                            <option value="limit">Limit</option>
-                            <option value="market">Market</option>
-                            <option value="ioc">IOC</option>
-                            <option value="fok">FOK</option>
-                        </select>
-                    </div>
-                    <div>
-                        <label for="quantity">Quantity:</label>
-                        <input type="number" id="quantity" name="quantity" step="0.00000001" min="0" required>
-                    </div>
-                    <div>
-                        <label for="price">Price:</label>
-                        <input type="number" id="price" name="price" step="0.01" min="0">
-                    </div>
-                    <div>
-                        <label for="clientOrderId">Client Order ID (optional):</label>
-                        <input type="text" id="clientOrderId" name="clientOrderId">
-                    </div>
-                    <div></div>
-                    <div>
-                        <button type="submit">Place Order</button>
-                    </div>
-                </form>
-            </div>
-            
-            <div class="section">
-                <h2>Order Book</h2>
-                <div class="order-book">
-                    <div class="bids">
-                        <h3>Bids</h3>
-                        <table id="bidsTable">
-                            <thead>
-                                <tr>
-                                    <th>Price</th>
-                                    <th>Quantity</th>
-                                </tr>
-                            </thead>
-                            <tbody></tbody>
-                        </table>
-                    </div>
-                    <div class="asks">
-                        <h3>Asks</h3>
-                        <table id="asksTable">
-                            <thead>
-                                <tr>
-                                    <th>Price</th>
-                                    <th>Quantity</th>
-                                </tr>
-                            </thead>
-                            <tbody></tbody>
-                        </table>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="section">
-                <h2>Recent Trades</h2>
-                <table id="tradesTable">
-                    <thead>
-                        <tr>
-                            <th>Time</th>
-                            <th>Price</th>
-                            <th>Quantity</th>
-                            <th>Side</th>
-                        </tr>
-                    </thead>
-                    <tbody id="trades"></tbody>
-                </table>
-            </div>
-        </div>
-
-        <script>
-            // Current symbol
-            let currentSymbol = 'BTC-USDT';
-            
-            // WebSocket connections
-            let tradeSocket;
-            let orderBookSocket;
-            
-            // Connect to WebSockets
-            function connectWebSockets() {
-                // Close existing connections if any
-                if (tradeSocket) tradeSocket.close();
-                if (orderBookSocket) orderBookSocket.close();
-                
-                // Connect to trade WebSocket
-                tradeSocket = new WebSocket(`ws://${window.location.host}/ws/trades/${currentSymbol}`);
-                tradeSocket.onmessage = function(event) {
-                    console.log("Trade message received:", event.data);
-                    try {
-                        const trade = JSON.parse(event.data);
-                        addTradeToTable(trade);
-                    } catch (error) {
-                        console.error("Error processing trade data:", error);
-                    }
-                };
-                
-                tradeSocket.onopen = function() {
-                    console.log("Trade WebSocket connected");
-                };
-                
-                tradeSocket.onerror = function(error) {
-                    console.error("Trade WebSocket error:", error);
-                };
-                
-                tradeSocket.onclose = function() {
-                    console.log("Trade WebSocket closed, reconnecting in 3 seconds...");
-                    setTimeout(connectWebSockets, 3000);
-                };
-                
-                // Connect to order book WebSocket
-                orderBookSocket = new WebSocket(`ws://${window.location.host}/ws/orderbook/${currentSymbol}`);
-                orderBookSocket.onmessage = function(event) {
-                    console.log("Order book message received:", event.data);
-                    try {
-                        const orderBook = JSON.parse(event.data);
-                        updateOrderBook(orderBook);
-                    } catch (error) {
-                        console.error("Error processing order book data:", error);
-                    }
-                };
-                
-                orderBookSocket.onopen = function() {
-                    console.log("Order book WebSocket connected");
-                };
-                
-                orderBookSocket.onerror = function(error) {
-                    console.error("Order book WebSocket error:", error);
-                };
-                
-                orderBookSocket.onclose = function() {
-                    console.log("Order book WebSocket closed, reconnecting in 3 seconds...");
-                    setTimeout(connectWebSockets, 3000);
-                };
-            }
-            
-            // Add a trade to the trades table
-            function addTradeToTable(trade) {
-                const tbody = document.getElementById('trades');
-                const row = document.createElement('tr');
-                
-                // Format timestamp
-                const date = new Date(trade.timestamp);
-                const time = date.toLocaleTimeString();
-                
-                row.innerHTML = `
-                    <td>${time}</td>
-                    <td>${trade.price}</td>
-                    <td>${trade.quantity}</td>
-                    <td>${trade.aggressor_side}</td>
-                `;
-                
-                // Add the row at the top
-                tbody.insertBefore(row, tbody.firstChild);
-                
-                // Limit to 50 trades
-                if (tbody.children.length > 50) {
-                    tbody.removeChild(tbody.lastChild);
-                }
-            }
-            
-            // Update the order book display
-            function updateOrderBook(orderBook) {
-                console.log("Received order book update:", orderBook);
-                
-                // Update bids
-                const bidsBody = document.querySelector('#bidsTable tbody');
-                bidsBody.innerHTML = '';
-                
-                if (orderBook.bids && Array.isArray(orderBook.bids)) {
-                    orderBook.bids.forEach(bid => {
-                        const row = document.createElement('tr');
-                        row.innerHTML = `
-                            <td>${bid[0]}</td>
-                            <td>${bid[1]}</td>
-                        `;
-                        bidsBody.appendChild(row);
-                    });
-                } else {
-                    console.error("Invalid bids data:", orderBook.bids);
-                }
-                
-                // Update asks
-                const asksBody = document.querySelector('#asksTable tbody');
-                asksBody.innerHTML = '';
-                
-                if (orderBook.asks && Array.isArray(orderBook.asks)) {
-                    orderBook.asks.forEach(ask => {
-                        const row = document.createElement('tr');
-                        row.innerHTML = `
-                            <td>${ask[0]}</td>
-                            <td>${ask[1]}</td>
-                        `;
-                        asksBody.appendChild(row);
-                    });
-                } else {
-                    console.error("Invalid asks data:", orderBook.asks);
-                }
-            }
-            
-            // Handle order form submission
-            document.getElementById('orderForm').addEventListener('submit', async function(e) {
-                e.preventDefault();
-                
-                // Get form data
-                const formData = new FormData(this);
-                const orderData = {
-                    symbol: formData.get('symbol'),
-                    side: formData.get('side'),
-                    type: formData.get('type'),
-                    quantity: formData.get('quantity')
-                };
-                
-                // Add price if it's not a market order
-                if (orderData.type !== 'market' && formData.get('price')) {
-                    orderData.price = formData.get('price');
-                }
-                
-                // Add client order ID if provided
-                if (formData.get('clientOrderId')) {
-                    orderData.client_order_id = formData.get('clientOrderId');
-                }
-                
-                try {
-                    // Send the order
-                    const response = await fetch('/api/orders', {
-                        method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json'
-                        },
-                        body: JSON.stringify(orderData)
-                    });
-                    
-                    if (!response.ok) {
-                        const error = await response.json();
-                        alert(`Error: ${error.detail}`);
-                        return;
-                    }
-                    
-                    const result = await response.json();
-                    alert(`Order placed successfully! Order ID: ${result.order_id}`);
-                    
-                    // Update current symbol if changed
-                    if (orderData.symbol !== currentSymbol) {
-                        currentSymbol = orderData.symbol;
-                        connectWebSockets();
-                    }
-                    
-                } catch (error) {
-                    alert(`Error: ${error.message}`);
-                }
-            });
-            
-            // Initialize
-            document.addEventListener('DOMContentLoaded', function() {
-                // Load initial order book
-                fetch(`/api/orderbook/${currentSymbol}`)
-                    .then(response => response.json())
-                    .then(data => updateOrderBook(data))
-                    .catch(error => console.error('Error loading order book:', error));
-                
-                // Connect to WebSockets
-                connectWebSockets();
-                
-                // Handle type change to show/hide price field
-                document.getElementById('type').addEventListener('change', function() {
-                    const priceField = document.getElementById('price');
-                    const priceLabel = document.querySelector('label[for="price"]');
-                    
-                    if (this.value === 'market') {
-                        priceField.disabled = true;
-                        priceField.required = false;
-                        priceLabel.innerHTML = 'Price (not required for market orders):';
-                    } else {
-                        priceField.disabled = false;
-                        priceField.required = true;
-                        priceLabel.innerHTML = 'Price:';
-                    }
-                });
-            });
-        </script>
-    </body>
-    </html>
-    """
\ No newline at end of file
+    return HTMLResponse(INDEX_HTML)
@@ -1,32 +1,38 @@
 from decimal import Decimal
 from typing import Dict, List, Tuple, Optional, Any
-from datetime import datetime
-import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import count, islice
+import time
 
-from .order import Order, OrderType, OrderSide, OrderStatus
+from .order import ID_PREFIX, Order, OrderType, OrderSide, OrderStatus, format_timestamp, from_ticks
 from .order_book import OrderBook
 
 
+_trade_seq = count()
+
+
+def _next_trade_id() -> str:
+    return f"{ID_PREFIX}-t{next(_trade_seq)}"
+
+
+@dataclass(slots=True)
 class Trade:
     """Represents a trade execution."""
     
-    def __init__(
-        self,
-        symbol: str,
-        price: Decimal,
-        quantity: Decimal,
-        maker_order_id: str,
-        taker_order_id: str,
-        aggressor_side: OrderSide
-    ):
-        self.trade_id = str(uuid.uuid4())
-        self.symbol = symbol
-        self.price = price
-        self.quantity = quantity
-        self.maker_order_id = maker_order_id
-        self.taker_order_id = taker_order_id
-        self.aggressor_side = aggressor_side
-        self.timestamp = datetime.utcnow()
+    symbol: str
+    price: Decimal
+    quantity_ticks: int
+    quantity_exp: int  # Exponent for rendering quantity_ticks as a Decimal
+    maker_order_id: str
+    taker_order_id: str
+    aggressor_side: OrderSide
+    timestamp: int = field(default_factory=time.time_ns)  # Nanoseconds since the epoch
+    trade_id: str = field(default_factory=_next_trade_id)
+    
+    @property
+    def quantity(self) -> Decimal:
+        return from_ticks(self.quantity_ticks, self.quantity_exp)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert trade to dictionary for API responses."""
@@ -38,156 +44,198 @@ class Trade:
             "maker_order_id": self.maker_order_id,
             "taker_order_id": self.taker_order_id,
             "aggressor_side": self.aggressor_side.value,
-            "timestamp": self.timestamp.isoformat() + "Z"
+            "timestamp": format_timestamp(self.timestamp) + "Z"
         }
 
 
+class _PerTradeListener:
+    """Adapts a callback taking one trade to the batched listener protocol."""
+    
+    __slots__ = ("callback",)
+    
+    def __init__(self, callback):
+        self.callback = callback
+    
+    def __call__(self, trades: List[Trade]):
+        callback = self.callback
+        for trade in trades:
+            callback(trade)
+
+
 class MatchingEngine:
     """Core matching engine implementing price-time priority matching."""
     
+    MAX_TRADE_HISTORY = 100_000  # Older trades of each symbol are dropped from its history
+    
     def __init__(self):
         self.order_books = {}  # Symbol -> OrderBook
-        self.trades = []  # List of executed trades
-        self.trade_listeners = []  # Callbacks for trade notifications
+        self.trades = {}  # Symbol -> deque of the most recent executed trades
+        self.trade_listeners = ()  # Callbacks taking a list of trades, replaced rather than mutated
+        
+        # Matching routine for each order type
+        self._matchers = {
+            OrderType.MARKET: self._match_market_order,
+            OrderType.LIMIT: self._match_limit_order,
+            OrderType.IOC: self._match_ioc_order,
+            OrderType.FOK: self._match_fok_order,
+        }
     
     def get_order_book(self, symbol: str) -> OrderBook:
         """Get or create an order book for a symbol."""
-        if symbol not in self.order_books:
-            self.order_books[symbol] = OrderBook(symbol)
-        return self.order_books[symbol]
+        order_book = self.order_books.get(symbol)
+        if order_book is None:
+            order_book = self.order_books[symbol] = OrderBook(symbol)
+        return order_book
     
     def add_trade_listener(self, callback):
-        """Add a callback function to be notified of trades."""
-        self.trade_listeners.append(callback)
+        """Add a callback function to be notified of each trade."""
+        self.add_trade_batch_listener(_PerTradeListener(callback))
     
-    def _notify_trade(self, trade: Trade):
-        """Notify all listeners of a new trade."""
+    def add_trade_batch_listener(self, callback):
+        """Add a callback function to be notified once per order with all of its trades."""
+        self.trade_listeners = self.trade_listeners + (callback,)
+    
+    def remove_trade_listener(self, callback):
+        """Remove a previously added trade callback."""
+        # Listeners may remove themselves while a notification is being delivered
+        self.trade_listeners = tuple(
+            listener for listener in self.trade_listeners
+            if listener != callback and getattr(listener, "callback", None) != callback
+        )
+    
+    def get_trades(self, symbol: str, limit: int = 100, offset: int = 0) -> List[Trade]:
+        """Get recent trades for a symbol, newest first."""
+        history = self.trades.get(symbol)
+        if history is None:
+            return []
+        return list(islice(reversed(history), offset, offset + limit))
+    
+    def _notify_trades(self, trades: List[Trade]):
+        """Notify all listeners of the trades from one order."""
         for callback in self.trade_listeners:
-            callback(trade)
+            callback(trades)
     
     def process_order(self, order: Order) -> Tuple[Order, List[Trade]]:
         """Process an incoming order according to its type and matching rules."""
         order_book = self.get_order_book(order.symbol)
-        trades = []
         
         # Handle different order types
-        if order.order_type == OrderType.MARKET:
-            trades = self._match_market_order(order, order_book)
-        elif order.order_type == OrderType.LIMIT:
-            trades = self._match_limit_order(order, order_book)
-        elif order.order_type == OrderType.IOC:
-            trades = self._match_ioc_order(order, order_book)
-        elif order.order_type == OrderType.FOK:
-            trades = self._match_fok_order(order, order_book)
+        trades = self._matchers[order.order_type](order, order_book)
         
-        # Notify listeners of trades
-        for trade in trades:
-            self.trades.append(trade)
-            self._notify_trade(trade)
+        if trades:
+            # Fills modify resting orders in place, so mark the book as changed
+            order_book.version += 1
+            
+            # Record the trades and notify listeners once for the whole batch
+            history = self.trades.get(order.symbol)
+            if history is None:
+                history = self.trades[order.symbol] = deque(maxlen=self.MAX_TRADE_HISTORY)
+            history.extend(trades)
+            self._notify_trades(trades)
         
         return order, trades
     
-    def _match_market_order(self, order: Order, order_book: OrderBook) -> List[Trade]:
-        """Match a market order against the order book."""
+    def _match(self, order: Order, order_book: OrderBook, limit_ticks: Optional[int] = None) -> List[Trade]:
+        """Match an order against the opposite side of the book in price-time priority.
+        
+        Matching stops once the order is filled, the opposite side is exhausted, or
+        the best price is worse than `limit_ticks` (None accepts any price).
+        """
         trades = []
         
-        # Market orders execute immediately at best available price(s)
-        opposite_side = OrderSide.SELL if order.side == OrderSide.BUY else OrderSide.BUY
-        price_map = order_book.asks if order.side == OrderSide.BUY else order_book.bids
-        price_getter = min if order.side == OrderSide.BUY else max
+        # Buy orders take from the lowest ask, sell orders from the highest bid
+        is_buy = order.side_int > 0
+        price_map = order_book.asks if is_buy else order_book.bids
+        best_index = 0 if is_buy else -1
+        
+        # Hoist per-order attributes and bound methods out of the fill loop
+        symbol = order.symbol
+        side = order.side
+        taker_order_id = order.order_id
+        fill_order = order.fill_ticks
+        add_trade = trades.append
+        peek_best = price_map.peekitem
+        discard_filled = order_book.discard_filled
+        
+        # Count the levels within the limit price up front. Matching only takes
+        # levels from the best end, so the loop needs no per-level price or side test
+        if limit_ticks is None:
+            levels = len(price_map)
+        elif is_buy:
+            levels = price_map.bisect_right(limit_ticks)  # Asks at or below the limit
+        else:
+            levels = len(price_map) - price_map.bisect_left(limit_ticks)  # Bids at or above the limit
+        
+        # The taker's remaining ticks, kept in a local as the loop's running count
+        remaining = order.remaining_ticks
         
         # Continue matching until the order is filled or no more liquidity
-        while order.remaining_quantity > Decimal("0") and price_map:
-            # Get the best price level
-            best_price = price_getter(price_map.keys())
-            price_level = price_map[best_price]
+        while remaining > 0 and levels:
+            price_level = peek_best(best_index)[1]
             
-            while order.remaining_quantity > Decimal("0") and not price_level.is_empty():
-                resting_order = price_level.get_oldest_order()
+            # Drain the level's queue until it or the incoming order runs out
+            oldest_order = price_level.get_oldest_order
+            while remaining > 0:
+                resting_order = oldest_order()
+                if resting_order is None:
+                    break
                 
-                # Calculate fill quantity
-                fill_quantity = min(order.remaining_quantity, resting_order.remaining_quantity)
+                # Fill the smaller remaining quantity (the incoming order's on a tie)
+                resting_remaining = resting_order.remaining_ticks
+                if remaining <= resting_remaining:
+                    fill_ticks = remaining
+                    fill_exp = order.remaining_exp
+                else:
+                    fill_ticks = resting_remaining
+                    fill_exp = resting_order.remaining_exp
                 
-                # Execute the trade
-                trade = Trade(
-                    symbol=order.symbol,
-                    price=resting_order.price,
-                    quantity=fill_quantity,
-                    maker_order_id=resting_order.order_id,
-                    taker_order_id=order.order_id,
-                    aggressor_side=order.side
-                )
-                trades.append(trade)
+                # Execute the trade (positional arguments, in Trade's field order,
+                # skip keyword matching in the generated __init__)
+                add_trade(Trade(
+                    symbol,
+                    resting_order.price,
+                    fill_ticks,
+                    fill_exp,
+                    resting_order.order_id,
+                    taker_order_id,
+                    side,
+                ))
                 
-                # Update orders
-                order.fill(fill_quantity, resting_order.price)
-                resting_order.fill(fill_quantity, resting_order.price)
+                # Update orders and the level's total quantity
+                fill_order(fill_ticks, fill_exp)
+                resting_order.fill_ticks(fill_ticks, fill_exp)
+                price_level.record_fill(fill_ticks, fill_exp)
+                remaining -= fill_ticks
                 
                 # Remove filled resting order
-                if resting_order.status == OrderStatus.FILLED:
+                if fill_ticks == resting_remaining:
                     price_level.pop_oldest_order()
+                    discard_filled(resting_order.order_id)
             
             # Remove empty price level
             if price_level.is_empty():
-                del price_map[best_price]
+                order_book.pop_level(price_map, best_index)
+                levels -= 1
+        
+        return trades
+    
+    def _match_market_order(self, order: Order, order_book: OrderBook) -> List[Trade]:
+        """Match a market order against the order book."""
+        # Market orders execute immediately at best available price(s)
+        trades = self._match(order, order_book)
         
         # If market order couldn't be fully filled, mark as partially filled
-        if order.remaining_quantity > Decimal("0"):
+        if order.remaining_ticks > 0:
             order.status = OrderStatus.PARTIALLY_FILLED
         
         return trades
     
     def _match_limit_order(self, order: Order, order_book: OrderBook) -> List[Trade]:
         """Match a limit order against the order book."""
-        trades = []
-        
-        # For buy orders, match against asks where ask price <= limit price
-        # For sell orders, match against bids where bid price >= limit price
-        opposite_side = OrderSide.SELL if order.side == OrderSide.BUY else OrderSide.BUY
-        price_map = order_book.asks if order.side == OrderSide.BUY else order_book.bids
-        price_getter = min if order.side == OrderSide.BUY else max
-        price_valid = (lambda p: p <= order.price) if order.side == OrderSide.BUY else (lambda p: p >= order.price)
-        
-        # Match against existing orders
-        while order.remaining_quantity > Decimal("0") and price_map:
-            # Check if there are any valid price levels
-            if not price_map or not price_valid(price_getter(price_map.keys())):
-                break
-            
-            best_price = price_getter(price_map.keys())
-            price_level = price_map[best_price]
-            
-            while order.remaining_quantity > Decimal("0") and not price_level.is_empty() and price_valid(best_price):
-                resting_order = price_level.get_oldest_order()
-                
-                # Calculate fill quantity
-                fill_quantity = min(order.remaining_quantity, resting_order.remaining_quantity)
-                
-                # Execute the trade
-                trade = Trade(
-                    symbol=order.symbol,
-                    price=resting_order.price,
-                    quantity=fill_quantity,
-                    maker_order_id=resting_order.order_id,
-                    taker_order_id=order.order_id,
-                    aggressor_side=order.side
-                )
-                trades.append(trade)
-                
-                # Update orders
-                order.fill(fill_quantity, resting_order.price)
-                resting_order.fill(fill_quantity, resting_order.price)
-                
-                # Remove filled resting order
-                if resting_order.status == OrderStatus.FILLED:
-                    price_level.pop_oldest_order()
-            
-            # Remove empty price level
-            if price_level.is_empty():
-                del price_map[best_price]
+        trades = self._match(order, order_book, order.price_ticks)
         
         # If limit order has remaining quantity, add to the book
-        if order.remaining_quantity > Decimal("0"):
+        if order.remaining_ticks > 0:
             order.status = OrderStatus.OPEN
             order_book.add_order(order)
         
@@ -196,54 +244,9 @@ class MatchingEngine:
     def _match_ioc_order(self, order: Order, order_book: OrderBook) -> List[Trade]:
         """Match an IOC (Immediate-Or-Cancel) order against the order book."""
         # IOC orders are like limit orders but any unfilled portion is cancelled
-        trades = []
-        
-        # Same matching logic as limit orders
-        opposite_side = OrderSide.SELL if order.side == OrderSide.BUY else OrderSide.BUY
-        price_map = order_book.asks if order.side == OrderSide.BUY else order_book.bids
-        price_getter = min if order.side == OrderSide.BUY else max
-        price_valid = (lambda p: p <= order.price) if order.side == OrderSide.BUY else (lambda p: p >= order.price)
-        
-        # Match against existing orders
-        while order.remaining_quantity > Decimal("0") and price_map:
-            # Check if there are any valid price levels
-            if not price_map or not price_valid(price_getter(price_map.keys())):
-                break
-            
-            best_price = price_getter(price_map.keys())
-            price_level = price_map[best_price]
-            
-            while order.remaining_quantity > Decimal("0") and not price_level.is_empty() and price_valid(best_price):
-                resting_order = price_level.get_oldest_order()
-                
-                # Calculate fill quantity
-                fill_quantity = min(order.remaining_quantity, resting_order.remaining_quantity)
-                
-                # Execute the trade
-                trade = Trade(
-                    symbol=order.symbol,
-                    price=resting_order.price,
-                    quantity=fill_quantity,
-                    maker_order_id=resting_order.order_id,
-                    taker_order_id=order.order_id,
-                    aggressor_side=order.side
-                )
-                trades.append(trade)
-                
-                # Update orders
-                order.fill(fill_quantity, resting_order.price)
-                resting_order.fill(fill_quantity, resting_order.price)
-                
-                # Remove filled resting order
-                if resting_order.status == OrderStatus.FILLED:
-                    price_level.pop_oldest_order()
-            
-            # Remove empty price level
-            if price_level.is_empty():
-                del price_map[best_price]
+        trades = self._match(order, order_book, order.price_ticks)
         
-        # Cancel any unfilled portion
-        if order.remaining_quantity > Decimal("0"):
+        if order.remaining_ticks > 0:
             order.status = OrderStatus.CANCELLED
         
         return trades
@@ -251,99 +254,54 @@ class MatchingEngine:
     def _match_fok_order(self, order: Order, order_book: OrderBook) -> List[Trade]:
         """Match a FOK (Fill-Or-Kill) order against the order book."""
         # FOK orders must be filled completely or not at all
-        trades = []
-        
-        # Check if the order can be fully filled
-        can_fill = self._can_fully_fill_order(order, order_book)
-        
-        if can_fill:
-            # Same matching logic as limit orders
-            opposite_side = OrderSide.SELL if order.side == OrderSide.BUY else OrderSide.BUY
-            price_map = order_book.asks if order.side == OrderSide.BUY else order_book.bids
-            price_getter = min if order.side == OrderSide.BUY else max
-            price_valid = (lambda p: p <= order.price) if order.side == OrderSide.BUY else (lambda p: p >= order.price)
-            
-            # Match against existing orders
-            while order.remaining_quantity > Decimal("0") and price_map:
-                # Check if there are any valid price levels
-                if not price_map or not price_valid(price_getter(price_map.keys())):
-                    break
-                
-                best_price = price_getter(price_map.keys())
-                price_level = price_map[best_price]
-                
-                while order.remaining_quantity > Decimal("0") and not price_level.is_empty() and price_valid(best_price):
-                    resting_order = price_level.get_oldest_order()
-                    
-                    # Calculate fill quantity
-                    fill_quantity = min(order.remaining_quantity, resting_order.remaining_quantity)
-                    
-                    # Execute the trade
-                    trade = Trade(
-                        symbol=order.symbol,
-                        price=resting_order.price,
-                        quantity=fill_quantity,
-                        maker_order_id=resting_order.order_id,
-                        taker_order_id=order.order_id,
-                        aggressor_side=order.side
-                    )
-                    trades.append(trade)
-                    
-                    # Update orders
-                    order.fill(fill_quantity, resting_order.price)
-                    resting_order.fill(fill_quantity, resting_order.price)
-                    
-                    # Remove filled resting order
-                    if resting_order.status == OrderStatus.FILLED:
-                        price_level.pop_oldest_order()
-                
-                # Remove empty price level
-                if price_level.is_empty():
-                    del price_map[best_price]
-        else:
-            # Cannot fully fill, cancel the order
+        if not self._can_fully_fill_order(order, order_book):
             order.status = OrderStatus.CANCELLED
+            return []
         
-        return trades
+        return self._match(order, order_book, order.price_ticks)
     
     def _can_fully_fill_order(self, order: Order, order_book: OrderBook) -> bool:
         """Check if an order can be fully filled at the current order book state."""
-        remaining_quantity = order.quantity
+        remaining_ticks = order.qty_ticks
+        limit_ticks = order.price_ticks
+        is_buy = order.side_int > 0
+        price_map = order_book.asks if is_buy else order_book.bids
+        if not price_map:
+            return False
         
-        # For buy orders, check asks
-        # For sell orders, check bids
-        price_map = order_book.asks if order.side == OrderSide.BUY else order_book.bids
-        price_getter = min if order.side == OrderSide.BUY else max
-        price_valid = (lambda p: p <= order.price) if order.side == OrderSide.BUY else (lambda p: p >= order.price)
+        # Most FOK orders either miss the best price or fit within the best level,
+        # both answered without walking the book
+        best_price, best_level = price_map.peekitem(0 if is_buy else -1)
+        if best_price > limit_ticks if is_buy else best_price < limit_ticks:
+            return False
+        if best_level.total_ticks >= remaining_ticks:
+            return True
         
-        # Make a copy of price levels to avoid modifying the actual order book
-        price_levels = sorted(price_map.keys())
+        # Walk the opposite side from the best price up to the limit price:
+        # asks ascending for buy orders, bids descending for sell orders
+        if is_buy:
+            prices = price_map.irange(maximum=limit_ticks)
+        else:
+            prices = price_map.irange(minimum=limit_ticks, reverse=True)
         
-        for price in price_levels:
-            if not price_valid(price):
-                break
-            
-            price_level = price_map[price]
-            available_quantity = price_level.total_quantity
-            
-            if remaining_quantity <= available_quantity:
+        for price in prices:
+            remaining_ticks -= price_map[price].total_ticks
+            if remaining_ticks <= 0:
                 return True
-            
-            remaining_quantity -= available_quantity
         
         return False
     
     def cancel_order(self, order_id: str, symbol: str) -> Optional[Order]:
         """Cancel an order by ID."""
-        if symbol not in self.order_books:
+        order_book = self.order_books.get(symbol)
+        if order_book is None:
             return None
         
-        order_book = self.order_books[symbol]
-        order = order_book.get_order(order_id)
-        
-        if order:
-            order_book.remove_order(order_id)
-            order.cancel()
-            return order
+        # Removing by ID finds the order in the same lookup, so there is no separate get
+        order = order_book.remove_order(order_id)
+        if order is None:
+            # An order that has just filled is reported as it is
+            return order_book.filled_orders.get(order_id)
         
-        return None
\ No newline at end of file
+        order.cancel()
+        return order
\ No newline at end of file
@@ -1,5 +1,9 @@
+import itertools
+import secrets
+import sys
+import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
 from decimal import Decimal
 from typing import Optional, Dict, Any
@@ -17,6 +21,45 @@ class OrderSide(Enum):
     SELL = "sell"
 
 
+# Prices and quantities are matched as integer ticks of 1 / PRICE_SCALE
+PRICE_DECIMALS = 8
+PRICE_SCALE = 10 ** PRICE_DECIMALS
+
+
+def to_ticks(value: Decimal) -> int:
+    """Convert a Decimal amount to integer ticks."""
+    ticks = value.scaleb(PRICE_DECIMALS)
+    if ticks != ticks.to_integral_value():
+        raise ValueError(f"{value} has more than {PRICE_DECIMALS} decimal places")
+    return int(ticks)
+
+
+def from_ticks(ticks: int, exponent: int) -> Decimal:
+    """Convert integer ticks back to a Decimal with the given exponent."""
+    return Decimal(ticks).scaleb(-PRICE_DECIMALS).quantize(Decimal(1).scaleb(exponent))
+
+
+# Timestamps are kept as time.time_ns() integers and only formatted for output
+_EPOCH = datetime(1970, 1, 1)
+
+
+def format_timestamp(timestamp_ns: int) -> str:
+    """Format nanoseconds since the epoch as an ISO 8601 UTC string."""
+    return (_EPOCH + timedelta(microseconds=timestamp_ns // 1000)).isoformat()
+
+
+# Arrival sequence shared by all orders
+_order_seq = itertools.count()
+
+# Order and trade IDs are a per-process random prefix plus a counter, so they
+# stay unique across restarts and workers without a uuid4() call per ID
+ID_PREFIX = uuid.uuid4().hex[:12]
+
+# Random bits appended to each order ID. The API has no authentication, so an
+# order ID must not be guessable from the IDs seen in the trade feed
+ORDER_ID_TOKEN_BYTES = 8
+
+
 class OrderStatus(Enum):
     PENDING = "pending"
     OPEN = "open"
@@ -26,7 +69,17 @@ class OrderStatus(Enum):
     REJECTED = "rejected"
 
 
+# Statuses after which an order can no longer change
+_FINAL_STATUSES = (OrderStatus.FILLED, OrderStatus.CANCELLED, OrderStatus.REJECTED)
+
+
 class Order:
+    __slots__ = (
+        "order_id", "seq", "client_order_id", "symbol", "side", "side_int", "order_type", "quantity", "price",
+        "status", "created_at", "updated_at", "price_ticks", "qty_ticks", "filled_ticks",
+        "remaining_ticks", "filled_exp", "remaining_exp",
+    )
+    
     def __init__(
         self,
         symbol: str,
@@ -36,51 +89,81 @@ class Order:
         price: Optional[Decimal] = None,
         client_order_id: Optional[str] = None,
     ):
-        self.order_id = str(uuid.uuid4())
+        self.seq = next(_order_seq)  # Arrival order, for time priority
+        self.order_id = f"{ID_PREFIX}-{self.seq}-{secrets.token_hex(ORDER_ID_TOKEN_BYTES)}"
         self.client_order_id = client_order_id
-        self.symbol = symbol
+        self.symbol = sys.intern(symbol)  # Order book keys compare by identity first
         self.side = side
+        self.side_int = 1 if side is OrderSide.BUY else -1  # Cheap side test for hot paths
         self.order_type = order_type
         self.quantity = quantity
         self.price = price
         self.status = OrderStatus.PENDING
-        self.created_at = datetime.utcnow()
+        self.created_at = time.time_ns()  # Nanoseconds since the epoch
         self.updated_at = self.created_at
-        self.filled_quantity = Decimal("0")
-        self.remaining_quantity = quantity
         
         # Validate order
         self._validate()
+        
+        # Integer ticks used for all matching arithmetic
+        self.price_ticks = to_ticks(price) if price is not None else None
+        self.qty_ticks = to_ticks(quantity)
+        self.filled_ticks = 0
+        self.remaining_ticks = self.qty_ticks
+        
+        # Exponents for rendering filled/remaining ticks as Decimals the way
+        # Decimal arithmetic on the original values would have
+        self.filled_exp = 0
+        self.remaining_exp = quantity.as_tuple().exponent
+    
+    @property
+    def filled_quantity(self) -> Decimal:
+        return from_ticks(self.filled_ticks, self.filled_exp)
+    
+    @property
+    def remaining_quantity(self) -> Decimal:
+        return from_ticks(self.remaining_ticks, self.remaining_exp)
     
     def _validate(self):
         """Validate order parameters."""
         if self.quantity <= Decimal("0"):
             raise ValueError("Quantity must be positive")
         
-        if self.order_type != OrderType.MARKET and (self.price is None or self.price <= Decimal("0")):
+        if self.order_type is not OrderType.MARKET and (self.price is None or self.price <= Decimal("0")):
             raise ValueError("Price must be positive for non-market orders")
     
     def fill(self, fill_quantity: Decimal, fill_price: Decimal) -> None:
         """Record a fill for this order."""
-        if fill_quantity > self.remaining_quantity:
-            raise ValueError(f"Fill quantity {fill_quantity} exceeds remaining quantity {self.remaining_quantity}")
+        self.fill_ticks(to_ticks(fill_quantity), fill_quantity.as_tuple().exponent)
+    
+    def fill_ticks(self, fill_ticks: int, exponent: int = 0) -> None:
+        """Record a fill given in ticks; exponent is that of the fill quantity as a Decimal."""
+        if fill_ticks > self.remaining_ticks:
+            raise ValueError(
+                f"Fill quantity {from_ticks(fill_ticks, exponent)} exceeds "
+                f"remaining quantity {self.remaining_quantity}"
+            )
         
-        self.filled_quantity += fill_quantity
-        self.remaining_quantity -= fill_quantity
-        self.updated_at = datetime.utcnow()
+        self.filled_ticks += fill_ticks
+        self.remaining_ticks -= fill_ticks
+        if exponent < self.filled_exp:
+            self.filled_exp = exponent
+        if exponent < self.remaining_exp:
+            self.remaining_exp = exponent
+        self.updated_at = time.time_ns()
         
-        if self.remaining_quantity == Decimal("0"):
+        if self.remaining_ticks == 0:
             self.status = OrderStatus.FILLED
         else:
             self.status = OrderStatus.PARTIALLY_FILLED
     
     def cancel(self) -> bool:
         """Cancel the order if possible."""
-        if self.status in [OrderStatus.FILLED, OrderStatus.CANCELLED, OrderStatus.REJECTED]:
+        if self.status in _FINAL_STATUSES:
             return False
         
         self.status = OrderStatus.CANCELLED
-        self.updated_at = datetime.utcnow()
+        self.updated_at = time.time_ns()
         return True
     
     def to_dict(self) -> Dict[str, Any]:
@@ -94,8 +177,8 @@ class Order:
             "quantity": str(self.quantity),
             "price": str(self.price) if self.price is not None else None,
             "status": self.status.value,
-            "created_at": self.created_at.isoformat() + "Z",
-            "updated_at": self.updated_at.isoformat() + "Z",
+            "created_at": format_timestamp(self.created_at) + "Z",
+            "updated_at": format_timestamp(self.updated_at) + "Z",
             "filled_quantity": str(self.filled_quantity),
             "remaining_quantity": str(self.remaining_quantity)
         }
\ No newline at end of file
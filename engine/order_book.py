@@ -1,64 +1,181 @@
 from decimal import Decimal
 from typing import Dict, List, Tuple, Optional
-import heapq
-from collections import defaultdict
-from datetime import datetime
+from collections import OrderedDict, defaultdict, deque
+from itertools import islice
+import time
 
-from .order import Order, OrderSide, OrderStatus
+from sortedcontainers import SortedDict
+
+from .order import Order, OrderStatus, format_timestamp, from_ticks
 
 
 class PriceLevel:
     """Represents a price level in the order book with a queue of orders."""
     
+    __slots__ = ("price", "price_str", "orders", "_by_id", "total_ticks", "total_exp", "_total_str")
+    
     def __init__(self, price: Decimal):
         self.price = price
-        self.orders = []  # List of (timestamp, order_id, Order) tuples for price-time priority
-        self.total_quantity = Decimal("0")
+        self.price_str = str(price)  # Formatted once for snapshots
+        self.orders = deque()  # Orders in arrival order; removed orders linger until they reach the front
+        self._by_id = {}  # Order ID -> Order for orders still at this level
+        self.total_ticks = 0  # Remaining quantity of all orders, in ticks
+        self.total_exp = 0  # Exponent for rendering total_ticks as a Decimal
+        self._total_str = None  # Cached str(total_quantity), cleared when the total changes
+    
+    def reset(self, price: Decimal) -> None:
+        """Reinitialise an emptied level for reuse at another price."""
+        self.price = price
+        self.price_str = str(price)
+        self.orders.clear()
+        self._by_id.clear()
+        self.total_ticks = 0
+        self.total_exp = 0
+        self._total_str = None
+    
+    @property
+    def total_quantity(self) -> Decimal:
+        return from_ticks(self.total_ticks, self.total_exp)
+    
+    @property
+    def total_quantity_str(self) -> str:
+        if self._total_str is None:
+            self._total_str = str(self.total_quantity)
+        return self._total_str
+    
+    def _adjust_total(self, ticks: int, exponent: int) -> None:
+        self._total_str = None
+        self.total_ticks += ticks
+        if exponent < self.total_exp:
+            self.total_exp = exponent
+    
+    def _discard_removed(self) -> None:
+        """Drop removed orders from the front of the queue."""
+        orders = self.orders
+        by_id = self._by_id
+        # The queue only holds tombstones when it is longer than the live order map
+        if len(orders) == len(by_id):
+            return
+        while orders and orders[0].order_id not in by_id:
+            orders.popleft()
     
     def add_order(self, order: Order) -> None:
         """Add an order to this price level."""
-        timestamp = order.created_at.timestamp()
-        heapq.heappush(self.orders, (timestamp, order.order_id, order))
-        self.total_quantity += order.remaining_quantity
+        self.orders.append(order)
+        self._by_id[order.order_id] = order
+        self._adjust_total(order.remaining_ticks, order.remaining_exp)
+    
+    def record_fill(self, fill_ticks: int, exponent: int) -> None:
+        """Reduce the total quantity by a fill against one of this level's orders."""
+        self._adjust_total(-fill_ticks, exponent)
     
     def remove_order(self, order_id: str) -> Optional[Order]:
         """Remove an order from this price level by order_id."""
-        for i, (_, oid, order) in enumerate(self.orders):
-            if oid == order_id:
-                self.orders.pop(i)
-                heapq.heapify(self.orders)  # Re-heapify after removal
-                self.total_quantity -= order.remaining_quantity
-                return order
-        return None
+        # The order stays in the queue as a tombstone and is skipped once it reaches the front
+        order = self._by_id.pop(order_id, None)
+        if order is not None:
+            self._adjust_total(-order.remaining_ticks, order.remaining_exp)
+            
+            # Compact once removed orders outnumber live ones, so heavy cancelling
+            # cannot grow the queue without bound
+            if len(self.orders) > 2 * len(self._by_id) + 32:
+                by_id = self._by_id
+                self.orders = deque(o for o in self.orders if o.order_id in by_id)
+        return order
     
     def get_oldest_order(self) -> Optional[Order]:
         """Get the oldest order at this price level without removing it."""
+        self._discard_removed()
         if not self.orders:
             return None
-        return self.orders[0][2]
+        return self.orders[0]
     
     def pop_oldest_order(self) -> Optional[Order]:
         """Remove and return the oldest order at this price level."""
+        self._discard_removed()
         if not self.orders:
             return None
-        _, _, order = heapq.heappop(self.orders)
-        self.total_quantity -= order.remaining_quantity
+        order = self.orders.popleft()
+        del self._by_id[order.order_id]
+        self._adjust_total(-order.remaining_ticks, order.remaining_exp)
         return order
     
     def is_empty(self) -> bool:
         """Check if this price level has no orders."""
-        return len(self.orders) == 0
+        return not self._by_id
 
 
 class OrderBook:
     """Maintains the order book for a trading pair."""
     
+    MAX_FREE_LEVELS = 1024  # Emptied price levels kept for reuse
+    MAX_FILLED_ORDERS = 10_000  # Recently filled orders kept for late cancels
+    
     def __init__(self, symbol: str):
         self.symbol = symbol
-        self.bids = {}  # Price -> PriceLevel (sorted high to low)
-        self.asks = {}  # Price -> PriceLevel (sorted low to high)
+        
+        # Prices are arbitrary multiples of 1 / PRICE_SCALE with no configured tick size
+        # or range, so levels live in sorted maps rather than an array indexed by tick:
+        # lookups by price are dict hits and the best level is at a fixed end
+        self.bids = SortedDict()  # Price ticks -> PriceLevel (best bid last)
+        self.asks = SortedDict()  # Price ticks -> PriceLevel (best ask first)
         self.orders = {}  # Order ID -> Order
-        self.last_updated = datetime.utcnow()
+        self.order_index = {}  # Order ID -> PriceLevel for orders resting in the book
+        self.filled_orders = OrderedDict()  # Order ID -> Order, most recently filled last
+        self.last_updated = time.time_ns()  # Nanoseconds since the epoch
+        self.version = 0  # Incremented on every change to the book
+        self._free_levels = []  # Emptied PriceLevels ready for reuse
+        
+        # Best levels, looked up again only after a level enters or leaves that side
+        self._best_bid = None
+        self._best_ask = None
+    
+    def _new_level(self, price: Decimal) -> PriceLevel:
+        """Get an empty price level, reusing a released one if available."""
+        if self._free_levels:
+            price_level = self._free_levels.pop()
+            price_level.reset(price)
+            return price_level
+        return PriceLevel(price)
+    
+    def _release_level(self, price_level: PriceLevel) -> None:
+        """Keep a level that has left the book for reuse."""
+        if len(self._free_levels) < self.MAX_FREE_LEVELS:
+            self._free_levels.append(price_level)
+    
+    def _levels_changed(self, price_map: SortedDict) -> None:
+        """Forget the cached best level of the side whose levels changed."""
+        if price_map is self.bids:
+            self._best_bid = None
+        else:
+            self._best_ask = None
+    
+    def pop_level(self, price_map: SortedDict, index: int) -> None:
+        """Remove the price level at the given position of bids or asks."""
+        self._release_level(price_map.popitem(index)[1])
+        self._levels_changed(price_map)
+    
+    def discard_filled(self, order_id: str) -> None:
+        """Forget a resting order that has been completely filled."""
+        # Only the most recent filled orders are kept, so that cancelling one that
+        # lost the race with a fill can still report it
+        filled_orders = self.filled_orders
+        filled_orders[order_id] = self.orders.pop(order_id)
+        del self.order_index[order_id]
+        if len(filled_orders) > self.MAX_FILLED_ORDERS:
+            filled_orders.popitem(last=False)
+    
+    def best_bid_level(self) -> Optional[PriceLevel]:
+        """Get the highest bid price level."""
+        if self._best_bid is None and self.bids:
+            self._best_bid = self.bids.peekitem(-1)[1]
+        return self._best_bid
+    
+    def best_ask_level(self) -> Optional[PriceLevel]:
+        """Get the lowest ask price level."""
+        if self._best_ask is None and self.asks:
+            self._best_ask = self.asks.peekitem(0)[1]
+        return self._best_ask
     
     def add_order(self, order: Order) -> None:
         """Add a new order to the book."""
@@ -66,34 +183,38 @@ class OrderBook:
             raise ValueError(f"Order with ID {order.order_id} already exists")
         
         # Only add limit orders to the book
-        if order.status == OrderStatus.OPEN:
-            price_map = self.bids if order.side == OrderSide.BUY else self.asks
+        if order.status is OrderStatus.OPEN:
+            price_map = self.bids if order.side_int > 0 else self.asks
             
-            if order.price not in price_map:
-                price_map[order.price] = PriceLevel(order.price)
+            price_level = price_map.get(order.price_ticks)
+            if price_level is None:
+                price_level = price_map[order.price_ticks] = self._new_level(order.price)
+                self._levels_changed(price_map)
             
-            price_map[order.price].add_order(order)
+            price_level.add_order(order)
             self.orders[order.order_id] = order
-            self.last_updated = datetime.utcnow()
+            self.order_index[order.order_id] = price_level
+            self.last_updated = time.time_ns()
+            self.version += 1
     
     def remove_order(self, order_id: str) -> Optional[Order]:
         """Remove an order from the book by order ID."""
-        if order_id not in self.orders:
+        order = self.orders.pop(order_id, None)
+        if order is None:
             return None
         
-        order = self.orders[order_id]
-        price_map = self.bids if order.side == OrderSide.BUY else self.asks
+        price_level = self.order_index.pop(order_id)
+        price_level.remove_order(order_id)
         
-        if order.price in price_map:
-            price_level = price_map[order.price]
-            price_level.remove_order(order_id)
-            
-            # Remove empty price levels
-            if price_level.is_empty():
-                del price_map[order.price]
+        # Remove empty price levels
+        if price_level.is_empty():
+            price_map = self.bids if order.side_int > 0 else self.asks
+            del price_map[order.price_ticks]
+            self._release_level(price_level)
+            self._levels_changed(price_map)
         
-        del self.orders[order_id]
-        self.last_updated = datetime.utcnow()
+        self.last_updated = time.time_ns()
+        self.version += 1
         return order
     
     def get_order(self, order_id: str) -> Optional[Order]:
@@ -102,35 +223,39 @@ class OrderBook:
     
     def get_best_bid(self) -> Optional[Tuple[Decimal, Decimal]]:
         """Get the best (highest) bid price and quantity."""
-        if not self.bids:
+        price_level = self.best_bid_level()
+        if price_level is None:
             return None
-        best_price = max(self.bids.keys())
-        return (best_price, self.bids[best_price].total_quantity)
+        return (price_level.price, price_level.total_quantity)
     
     def get_best_ask(self) -> Optional[Tuple[Decimal, Decimal]]:
         """Get the best (lowest) ask price and quantity."""
-        if not self.asks:
+        price_level = self.best_ask_level()
+        if price_level is None:
             return None
-        best_price = min(self.asks.keys())
-        return (best_price, self.asks[best_price].total_quantity)
+        return (price_level.price, price_level.total_quantity)
     
-    def get_order_book_snapshot(self):
-        """Get a snapshot of the order book for API responses."""
-        timestamp = datetime.utcnow().isoformat()
+    def get_order_book_snapshot(self, depth: Optional[int] = None):
+        """Get a snapshot of the order book for API responses.
+        
+        If depth is given, only the best `depth` price levels of each side are included.
+        """
+        timestamp = format_timestamp(time.time_ns())
+        
+        # Levels leave the book as soon as they empty, so every level has quantity
+        # and the best `depth` levels are simply the first ones from the best end
         
-        # Convert bids to list of [price, quantity] pairs
-        bids = []
-        for price in sorted(self.bids.keys(), reverse=True):
-            price_level = self.bids[price]
-            if price_level.total_quantity > 0:
-                bids.append([str(price), str(price_level.total_quantity)])
+        # Convert bids to list of [price, quantity] pairs, best first
+        bids = [
+            [price_level.price_str, price_level.total_quantity_str]
+            for price_level in islice(reversed(self.bids.values()), depth)
+        ]
         
-        # Convert asks to list of [price, quantity] pairs
-        asks = []
-        for price in sorted(self.asks.keys()):
-            price_level = self.asks[price]
-            if price_level.total_quantity > 0:
-                asks.append([str(price), str(price_level.total_quantity)])
+        # Convert asks to list of [price, quantity] pairs, best first
+        asks = [
+            [price_level.price_str, price_level.total_quantity_str]
+            for price_level in islice(self.asks.values(), depth)
+        ]
         
         return {
             "symbol": self.symbol,
@@ -141,27 +266,25 @@ class OrderBook:
     
     def get_bbo(self):
         """Get the best bid and offer (BBO)."""
-        timestamp = datetime.utcnow().isoformat()
+        timestamp = format_timestamp(time.time_ns())
         
         # Get best bid
         bid = None
-        if self.bids:
-            best_bid_price = max(self.bids.keys()) if self.bids else None
-            if best_bid_price and self.bids[best_bid_price].total_quantity > 0:
-                bid = {
-                    "price": str(best_bid_price),
-                    "quantity": str(self.bids[best_bid_price].total_quantity)
-                }
+        price_level = self.best_bid_level()
+        if price_level is not None:
+            bid = {
+                "price": price_level.price_str,
+                "quantity": price_level.total_quantity_str
+            }
         
         # Get best ask
         ask = None
-        if self.asks:
-            best_ask_price = min(self.asks.keys()) if self.asks else None
-            if best_ask_price and self.asks[best_ask_price].total_quantity > 0:
-                ask = {
-                    "price": str(best_ask_price),
-                    "quantity": str(self.asks[best_ask_price].total_quantity)
-                }
+        price_level = self.best_ask_level()
+        if price_level is not None:
+            ask = {
+                "price": price_level.price_str,
+                "quantity": price_level.total_quantity_str
+            }
         
         return {
             "symbol": self.symbol,
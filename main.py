@@ -1,5 +1,6 @@
 import uvicorn
 import os
+import importlib.util
 from api.server import app
 from utils.logger import setup_logger
 
@@ -17,13 +18,27 @@ def main():
     """
     main_logger.info("Starting Cryptocurrency Matching Engine API")
     
+    # Use uvloop's libuv-based event loop where it is installed (it doesn't support Windows)
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    
+    # Auto-reload watches the source tree, so only enable it for development (DEV=1)
+    dev = bool(os.getenv("DEV"))
+    
+    # Each worker process runs its own MatchingEngine with separate order books,
+    # so only raise WORKERS when clients are routed to a fixed worker per symbol
+    workers = int(os.getenv("WORKERS", "1"))
+    
     # Run the server
     uvicorn.run(
         "api.server:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
-        log_level="info"
+        reload=dev,
+        workers=None if dev else workers,
+        loop=loop,
+        http=http,
+        log_level="info" if dev else "warning"
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,93 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the api modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+import orjson
+import time
+
+from api.server import app, matching_engine, serialize_snapshot
+
+
+class TestOrderAPI(unittest.TestCase):
+    def setUp(self):
+        # Used without `with`, so the app's startup hooks never run
+        self.client = TestClient(app)
+    
+    def submit_order(self, symbol, side, order_type, quantity, price=None):
+        order = {"symbol": symbol, "side": side, "type": order_type, "quantity": quantity}
+        if price is not None:
+            order["price"] = price
+        return self.client.post("/api/orders", json=order)
+    
+    def test_crossing_order_before_startup(self):
+        # Rest a sell order, then cross it before any broadcast worker exists
+        response = self.submit_order("API-NOSTART", "sell", "limit", "1.0", "100")
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.submit_order("API-NOSTART", "buy", "market", "1.0")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "filled")
+        
+        # Verify the trade was recorded and the book emptied
+        trades = self.client.get("/api/trades/API-NOSTART").json()
+        self.assertEqual(len(trades), 1)
+        self.assertEqual(trades[0]["price"], "100")
+        
+        order_book = self.client.get("/api/orderbook/API-NOSTART").json()
+        self.assertEqual(order_book["asks"], [])
+    
+    def test_crossing_order_after_shutdown(self):
+        # Start and stop the app, leaving no broadcast worker behind
+        with TestClient(app):
+            pass
+        
+        response = self.submit_order("API-SHUTDOWN", "sell", "limit", "1.0", "100")
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.submit_order("API-SHUTDOWN", "buy", "market", "1.0")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "filled")
+    
+    def test_cancel_filled_order(self):
+        # Fill a resting sell order before trying to cancel it
+        maker = self.submit_order("API-FILLED", "sell", "limit", "1.0", "100").json()
+        self.submit_order("API-FILLED", "buy", "market", "1.0")
+        
+        response = self.client.delete(f"/api/orders/{maker['order_id']}", params={"symbol": "API-FILLED"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "filled")
+    
+    def test_cancel_unknown_order(self):
+        response = self.client.delete("/api/orders/missing", params={"symbol": "API-FILLED"})
+        self.assertEqual(response.status_code, 404)
+
+    
+    def test_cached_snapshot_is_stamped_when_served(self):
+        self.submit_order("API-STAMP", "sell", "limit", "1.0", "100")
+        order_book = matching_engine.get_order_book("API-STAMP")
+        
+        first = orjson.loads(serialize_snapshot("orderbook", order_book))
+        time.sleep(0.002)
+        second = orjson.loads(serialize_snapshot("orderbook", order_book))
+        
+        # The book is unchanged, so only the timestamp moves
+        self.assertNotEqual(first.pop("timestamp"), second.pop("timestamp"))
+        self.assertEqual(first, second)
+        self.assertEqual(first["asks"], [["100", "1.0"]])
+    
+    def test_rest_snapshots_use_current_time(self):
+        self.submit_order("API-REST", "buy", "limit", "1.0", "99")
+        
+        # Repeated requests for an unchanged book still carry the request time
+        for path in ("/api/orderbook/API-REST", "/api/bbo/API-REST"):
+            first = self.client.get(path).json()
+            time.sleep(0.002)
+            second = self.client.get(path).json()
+            self.assertNotEqual(first["timestamp"], second["timestamp"])
+
+if __name__ == "__main__":
+    unittest.main()
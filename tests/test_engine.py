@@ -1,5 +1,7 @@
+import copy
 import unittest
 from decimal import Decimal
+from functools import lru_cache
 import sys
 import os
 
@@ -11,6 +13,30 @@ from engine.order_book import OrderBook, PriceLevel
 from engine.matcher import MatchingEngine, Trade
 
 
+# Shared Decimal values; Decimals are immutable, so tests can reuse them
+P47K = Decimal("47000")
+P48K = Decimal("48000")
+P49K = Decimal("49000")
+P49_9K = Decimal("49900")
+P50K = Decimal("50000")
+P51K = Decimal("51000")
+P51_5K = Decimal("51500")
+P52K = Decimal("52000")
+
+Q0 = Decimal("0")
+Q0_5 = Decimal("0.5")
+Q1 = Decimal("1")
+Q1_0 = Decimal("1.0")
+Q1_5 = Decimal("1.5")
+Q2_0 = Decimal("2.0")
+Q2_2 = Decimal("2.2")
+Q2_5 = Decimal("2.5")
+Q3_0 = Decimal("3.0")
+
+# Parses any other literal once and returns the same Decimal on later calls
+d = lru_cache(maxsize=None)(Decimal)
+
+
 class TestOrder(unittest.TestCase):
     def test_order_creation(self):
         # Test limit order creation
@@ -18,31 +44,31 @@ class TestOrder(unittest.TestCase):
             symbol="BTC-USDT",
             side=OrderSide.BUY,
             order_type=OrderType.LIMIT,
-            quantity=Decimal("1.5"),
-            price=Decimal("50000")
+            quantity=Q1_5,
+            price=P50K
         )
         
         self.assertEqual(limit_order.symbol, "BTC-USDT")
         self.assertEqual(limit_order.side, OrderSide.BUY)
         self.assertEqual(limit_order.order_type, OrderType.LIMIT)
-        self.assertEqual(limit_order.quantity, Decimal("1.5"))
-        self.assertEqual(limit_order.price, Decimal("50000"))
+        self.assertEqual(limit_order.quantity, Q1_5)
+        self.assertEqual(limit_order.price, P50K)
         self.assertEqual(limit_order.status, OrderStatus.PENDING)
-        self.assertEqual(limit_order.filled_quantity, Decimal("0"))
-        self.assertEqual(limit_order.remaining_quantity, Decimal("1.5"))
+        self.assertEqual(limit_order.filled_quantity, Q0)
+        self.assertEqual(limit_order.remaining_quantity, Q1_5)
         
         # Test market order creation
         market_order = Order(
             symbol="ETH-USDT",
             side=OrderSide.SELL,
             order_type=OrderType.MARKET,
-            quantity=Decimal("2.0")
+            quantity=Q2_0
         )
         
         self.assertEqual(market_order.symbol, "ETH-USDT")
         self.assertEqual(market_order.side, OrderSide.SELL)
         self.assertEqual(market_order.order_type, OrderType.MARKET)
-        self.assertEqual(market_order.quantity, Decimal("2.0"))
+        self.assertEqual(market_order.quantity, Q2_0)
         self.assertIsNone(market_order.price)
         self.assertEqual(market_order.status, OrderStatus.PENDING)
     
@@ -53,8 +79,8 @@ class TestOrder(unittest.TestCase):
                 symbol="BTC-USDT",
                 side=OrderSide.BUY,
                 order_type=OrderType.LIMIT,
-                quantity=Decimal("-1.5"),
-                price=Decimal("50000")
+                quantity=d("-1.5"),
+                price=P50K
             )
         
         # Test invalid price for limit order
@@ -63,8 +89,8 @@ class TestOrder(unittest.TestCase):
                 symbol="BTC-USDT",
                 side=OrderSide.BUY,
                 order_type=OrderType.LIMIT,
-                quantity=Decimal("1.5"),
-                price=Decimal("-50000")
+                quantity=Q1_5,
+                price=d("-50000")
             )
         
         # Test missing price for limit order
@@ -73,7 +99,7 @@ class TestOrder(unittest.TestCase):
                 symbol="BTC-USDT",
                 side=OrderSide.BUY,
                 order_type=OrderType.LIMIT,
-                quantity=Decimal("1.5")
+                quantity=Q1_5
             )
     
     def test_order_fill(self):
@@ -81,33 +107,33 @@ class TestOrder(unittest.TestCase):
             symbol="BTC-USDT",
             side=OrderSide.BUY,
             order_type=OrderType.LIMIT,
-            quantity=Decimal("2.0"),
-            price=Decimal("50000")
+            quantity=Q2_0,
+            price=P50K
         )
         
         # Partial fill
-        order.fill(Decimal("0.5"), Decimal("49900"))
-        self.assertEqual(order.filled_quantity, Decimal("0.5"))
-        self.assertEqual(order.remaining_quantity, Decimal("1.5"))
+        order.fill(Q0_5, P49_9K)
+        self.assertEqual(order.filled_quantity, Q0_5)
+        self.assertEqual(order.remaining_quantity, Q1_5)
         self.assertEqual(order.status, OrderStatus.PARTIALLY_FILLED)
         
         # Complete fill
-        order.fill(Decimal("1.5"), Decimal("49900"))
-        self.assertEqual(order.filled_quantity, Decimal("2.0"))
-        self.assertEqual(order.remaining_quantity, Decimal("0"))
+        order.fill(Q1_5, P49_9K)
+        self.assertEqual(order.filled_quantity, Q2_0)
+        self.assertEqual(order.remaining_quantity, Q0)
         self.assertEqual(order.status, OrderStatus.FILLED)
         
         # Attempt to overfill
         with self.assertRaises(ValueError):
-            order.fill(Decimal("0.1"), Decimal("49900"))
+            order.fill(d("0.1"), P49_9K)
     
     def test_order_cancel(self):
         order = Order(
             symbol="BTC-USDT",
             side=OrderSide.BUY,
             order_type=OrderType.LIMIT,
-            quantity=Decimal("2.0"),
-            price=Decimal("50000")
+            quantity=Q2_0,
+            price=P50K
         )
         
         # Cancel open order
@@ -122,15 +148,15 @@ class TestOrder(unittest.TestCase):
 
 class TestOrderBook(unittest.TestCase):
     def test_price_level(self):
-        price_level = PriceLevel(Decimal("50000"))
+        price_level = PriceLevel(P50K)
         
         # Create test orders
         order1 = Order(
             symbol="BTC-USDT",
             side=OrderSide.BUY,
             order_type=OrderType.LIMIT,
-            quantity=Decimal("1.0"),
-            price=Decimal("50000")
+            quantity=Q1_0,
+            price=P50K
         )
         order1.status = OrderStatus.OPEN
         
@@ -138,17 +164,17 @@ class TestOrderBook(unittest.TestCase):
             symbol="BTC-USDT",
             side=OrderSide.BUY,
             order_type=OrderType.LIMIT,
-            quantity=Decimal("2.0"),
-            price=Decimal("50000")
+            quantity=Q2_0,
+            price=P50K
         )
         order2.status = OrderStatus.OPEN
         
         # Add orders to price level
         price_level.add_order(order1)
-        self.assertEqual(price_level.total_quantity, Decimal("1.0"))
+        self.assertEqual(price_level.total_quantity, Q1_0)
         
         price_level.add_order(order2)
-        self.assertEqual(price_level.total_quantity, Decimal("3.0"))
+        self.assertEqual(price_level.total_quantity, Q3_0)
         
         # Test price-time priority
         oldest_order = price_level.get_oldest_order()
@@ -157,14 +183,71 @@ class TestOrderBook(unittest.TestCase):
         # Test removing order
         removed_order = price_level.remove_order(order1.order_id)
         self.assertEqual(removed_order.order_id, order1.order_id)
-        self.assertEqual(price_level.total_quantity, Decimal("2.0"))
+        self.assertEqual(price_level.total_quantity, Q2_0)
         
         # Test popping oldest order
         popped_order = price_level.pop_oldest_order()
         self.assertEqual(popped_order.order_id, order2.order_id)
-        self.assertEqual(price_level.total_quantity, Decimal("0"))
+        self.assertEqual(price_level.total_quantity, Q0)
         self.assertTrue(price_level.is_empty())
     
+    def test_price_level_total_tracks_fills_and_removals(self):
+        price_level = PriceLevel(P50K)
+        
+        orders = []
+        for quantity in ("1.0", "0.25", "2"):
+            order = Order(
+                symbol="BTC-USDT",
+                side=OrderSide.SELL,
+                order_type=OrderType.LIMIT,
+                quantity=d(quantity),
+                price=P50K
+            )
+            order.status = OrderStatus.OPEN
+            price_level.add_order(order)
+            orders.append(order)
+        
+        # Partially fill the oldest order and remove the middle one
+        orders[0].fill(d("0.4"), P50K)
+        price_level.record_fill(orders[0].filled_ticks, orders[0].filled_exp)
+        price_level.remove_order(orders[1].order_id)
+        
+        # The running total equals the remaining quantity of the orders left
+        self.assertEqual(price_level.total_quantity, d("2.6"))
+        self.assertEqual(
+            price_level.total_quantity,
+            orders[0].remaining_quantity + orders[2].remaining_quantity
+        )
+        
+        # The removed order is skipped once it reaches the front
+        price_level.pop_oldest_order()
+        self.assertEqual(price_level.get_oldest_order().order_id, orders[2].order_id)
+        self.assertEqual(price_level.total_quantity, Q2_0)
+    
+    def test_price_level_compacts_removed_orders(self):
+        price_level = PriceLevel(P50K)
+        
+        orders = []
+        for _ in range(100):
+            order = Order(
+                symbol="BTC-USDT",
+                side=OrderSide.BUY,
+                order_type=OrderType.LIMIT,
+                quantity=Q1,
+                price=P50K
+            )
+            order.status = OrderStatus.OPEN
+            price_level.add_order(order)
+            orders.append(order)
+        
+        # Cancel every order but the oldest; the queue must not keep them all
+        for order in orders[1:]:
+            price_level.remove_order(order.order_id)
+        
+        self.assertLess(len(price_level.orders), 50)
+        self.assertEqual(price_level.get_oldest_order().order_id, orders[0].order_id)
+        self.assertEqual(price_level.total_quantity, Q1)
+    
     def test_order_book(self):
         order_book = OrderBook("BTC-USDT")
         
@@ -173,8 +256,8 @@ class TestOrderBook(unittest.TestCase):
             symbol="BTC-USDT",
             side=OrderSide.BUY,
             order_type=OrderType.LIMIT,
-            quantity=Decimal("1.0"),
-            price=Decimal("49000")
+            quantity=Q1_0,
+            price=P49K
         )
         buy_order1.status = OrderStatus.OPEN
         
@@ -182,8 +265,8 @@ class TestOrderBook(unittest.TestCase):
             symbol="BTC-USDT",
             side=OrderSide.BUY,
             order_type=OrderType.LIMIT,
-            quantity=Decimal("2.0"),
-            price=Decimal("50000")
+            quantity=Q2_0,
+            price=P50K
         )
         buy_order2.status = OrderStatus.OPEN
         
@@ -191,8 +274,8 @@ class TestOrderBook(unittest.TestCase):
             symbol="BTC-USDT",
             side=OrderSide.SELL,
             order_type=OrderType.LIMIT,
-            quantity=Decimal("1.5"),
-            price=Decimal("51000")
+            quantity=Q1_5,
+            price=P51K
         )
         sell_order1.status = OrderStatus.OPEN
         
@@ -200,8 +283,8 @@ class TestOrderBook(unittest.TestCase):
             symbol="BTC-USDT",
             side=OrderSide.SELL,
             order_type=OrderType.LIMIT,
-            quantity=Decimal("2.5"),
-            price=Decimal("52000")
+            quantity=Q2_5,
+            price=P52K
         )
         sell_order2.status = OrderStatus.OPEN
         
@@ -213,12 +296,12 @@ class TestOrderBook(unittest.TestCase):
         
         # Test best bid/ask
         best_bid = order_book.get_best_bid()
-        self.assertEqual(best_bid[0], Decimal("50000"))
-        self.assertEqual(best_bid[1], Decimal("2.0"))
+        self.assertEqual(best_bid[0], P50K)
+        self.assertEqual(best_bid[1], Q2_0)
         
         best_ask = order_book.get_best_ask()
-        self.assertEqual(best_ask[0], Decimal("51000"))
-        self.assertEqual(best_ask[1], Decimal("1.5"))
+        self.assertEqual(best_ask[0], P51K)
+        self.assertEqual(best_ask[1], Q1_5)
         
         # Test BBO
         bbo = order_book.get_bbo()
@@ -238,19 +321,27 @@ class TestOrderBook(unittest.TestCase):
         self.assertEqual(snapshot["asks"][0], ["51000", "1.5"])
         self.assertEqual(snapshot["asks"][1], ["52000", "2.5"])
         
+        # Test snapshot limited to the best level per side
+        snapshot = order_book.get_order_book_snapshot(depth=1)
+        self.assertEqual(snapshot["bids"], [["50000", "2.0"]])
+        self.assertEqual(snapshot["asks"], [["51000", "1.5"]])
+        
         # Test removing order
         removed_order = order_book.remove_order(buy_order2.order_id)
         self.assertEqual(removed_order.order_id, buy_order2.order_id)
         
         # Verify best bid updated
         best_bid = order_book.get_best_bid()
-        self.assertEqual(best_bid[0], Decimal("49000"))
-        self.assertEqual(best_bid[1], Decimal("1.0"))
+        self.assertEqual(best_bid[0], P49K)
+        self.assertEqual(best_bid[1], Q1_0)
 
 
 class TestMatchingEngine(unittest.TestCase):
-    def setUp(self):
-        self.engine = MatchingEngine()
+    @classmethod
+    def setUpClass(cls):
+        # Build the initial book once; each test works on its own deep copy
+        cls.prototype_engine = MatchingEngine()
+        engine = cls.prototype_engine
         
         # Add some initial orders to create liquidity
         # Buy side
@@ -258,8 +349,8 @@ class TestMatchingEngine(unittest.TestCase):
             symbol="BTC-USDT",
             side=OrderSide.BUY,
             order_type=OrderType.LIMIT,
-            quantity=Decimal("1.0"),
-            price=Decimal("49000")
+            quantity=Q1_0,
+            price=P49K
         )
         buy_limit_order1.status = OrderStatus.OPEN
         
@@ -267,8 +358,8 @@ class TestMatchingEngine(unittest.TestCase):
             symbol="BTC-USDT",
             side=OrderSide.BUY,
             order_type=OrderType.LIMIT,
-            quantity=Decimal("2.0"),
-            price=Decimal("48000")
+            quantity=Q2_0,
+            price=P48K
         )
         buy_limit_order2.status = OrderStatus.OPEN
         
@@ -277,8 +368,8 @@ class TestMatchingEngine(unittest.TestCase):
             symbol="BTC-USDT",
             side=OrderSide.SELL,
             order_type=OrderType.LIMIT,
-            quantity=Decimal("1.5"),
-            price=Decimal("51000")
+            quantity=Q1_5,
+            price=P51K
         )
         sell_limit_order1.status = OrderStatus.OPEN
         
@@ -286,25 +377,28 @@ class TestMatchingEngine(unittest.TestCase):
             symbol="BTC-USDT",
             side=OrderSide.SELL,
             order_type=OrderType.LIMIT,
-            quantity=Decimal("2.5"),
-            price=Decimal("52000")
+            quantity=Q2_5,
+            price=P52K
         )
         sell_limit_order2.status = OrderStatus.OPEN
         
         # Add orders to the book
-        order_book = self.engine.get_order_book("BTC-USDT")
+        order_book = engine.get_order_book("BTC-USDT")
         order_book.add_order(buy_limit_order1)
         order_book.add_order(buy_limit_order2)
         order_book.add_order(sell_limit_order1)
         order_book.add_order(sell_limit_order2)
     
+    def setUp(self):
+        self.engine = copy.deepcopy(self.prototype_engine)
+    
     def test_market_buy_order(self):
         # Create a market buy order
         market_buy = Order(
             symbol="BTC-USDT",
             side=OrderSide.BUY,
             order_type=OrderType.MARKET,
-            quantity=Decimal("1.0")
+            quantity=Q1_0
         )
         
         # Process the order
@@ -312,21 +406,21 @@ class TestMatchingEngine(unittest.TestCase):
         
         # Verify the order was filled
         self.assertEqual(result_order.status, OrderStatus.FILLED)
-        self.assertEqual(result_order.filled_quantity, Decimal("1.0"))
-        self.assertEqual(result_order.remaining_quantity, Decimal("0"))
+        self.assertEqual(result_order.filled_quantity, Q1_0)
+        self.assertEqual(result_order.remaining_quantity, Q0)
         
         # Verify a trade was created
         self.assertEqual(len(trades), 1)
         self.assertEqual(trades[0].symbol, "BTC-USDT")
-        self.assertEqual(trades[0].price, Decimal("51000"))
-        self.assertEqual(trades[0].quantity, Decimal("1.0"))
+        self.assertEqual(trades[0].price, P51K)
+        self.assertEqual(trades[0].quantity, Q1_0)
         self.assertEqual(trades[0].aggressor_side, OrderSide.BUY)
         
         # Verify the order book was updated
         order_book = self.engine.get_order_book("BTC-USDT")
         best_ask = order_book.get_best_ask()
-        self.assertEqual(best_ask[0], Decimal("51000"))
-        self.assertEqual(best_ask[1], Decimal("0.5"))
+        self.assertEqual(best_ask[0], P51K)
+        self.assertEqual(best_ask[1], Q0_5)
     
     def test_market_sell_order(self):
         # Create a market sell order
@@ -334,7 +428,7 @@ class TestMatchingEngine(unittest.TestCase):
             symbol="BTC-USDT",
             side=OrderSide.SELL,
             order_type=OrderType.MARKET,
-            quantity=Decimal("0.5")
+            quantity=Q0_5
         )
         
         # Process the order
@@ -342,21 +436,21 @@ class TestMatchingEngine(unittest.TestCase):
         
         # Verify the order was filled
         self.assertEqual(result_order.status, OrderStatus.FILLED)
-        self.assertEqual(result_order.filled_quantity, Decimal("0.5"))
-        self.assertEqual(result_order.remaining_quantity, Decimal("0"))
+        self.assertEqual(result_order.filled_quantity, Q0_5)
+        self.assertEqual(result_order.remaining_quantity, Q0)
         
         # Verify a trade was created
         self.assertEqual(len(trades), 1)
         self.assertEqual(trades[0].symbol, "BTC-USDT")
-        self.assertEqual(trades[0].price, Decimal("49000"))
-        self.assertEqual(trades[0].quantity, Decimal("0.5"))
+        self.assertEqual(trades[0].price, P49K)
+        self.assertEqual(trades[0].quantity, Q0_5)
         self.assertEqual(trades[0].aggressor_side, OrderSide.SELL)
         
         # Verify the order book was updated
         order_book = self.engine.get_order_book("BTC-USDT")
         best_bid = order_book.get_best_bid()
-        self.assertEqual(best_bid[0], Decimal("49000"))
-        self.assertEqual(best_bid[1], Decimal("0.5"))
+        self.assertEqual(best_bid[0], P49K)
+        self.assertEqual(best_bid[1], Q0_5)
     
     def test_limit_buy_order_immediate_execution(self):
         # Create a limit buy order that crosses the spread
@@ -364,8 +458,8 @@ class TestMatchingEngine(unittest.TestCase):
             symbol="BTC-USDT",
             side=OrderSide.BUY,
             order_type=OrderType.LIMIT,
-            quantity=Decimal("1.0"),
-            price=Decimal("51500")  # Higher than best ask
+            quantity=Q1_0,
+            price=P51_5K  # Higher than best ask
         )
         
         # Process the order
@@ -373,14 +467,14 @@ class TestMatchingEngine(unittest.TestCase):
         
         # Verify the order was filled
         self.assertEqual(result_order.status, OrderStatus.FILLED)
-        self.assertEqual(result_order.filled_quantity, Decimal("1.0"))
-        self.assertEqual(result_order.remaining_quantity, Decimal("0"))
+        self.assertEqual(result_order.filled_quantity, Q1_0)
+        self.assertEqual(result_order.remaining_quantity, Q0)
         
         # Verify a trade was created at the best ask price (price improvement)
         self.assertEqual(len(trades), 1)
         self.assertEqual(trades[0].symbol, "BTC-USDT")
-        self.assertEqual(trades[0].price, Decimal("51000"))  # Best ask price, not the limit price
-        self.assertEqual(trades[0].quantity, Decimal("1.0"))
+        self.assertEqual(trades[0].price, P51K)  # Best ask price, not the limit price
+        self.assertEqual(trades[0].quantity, Q1_0)
         self.assertEqual(trades[0].aggressor_side, OrderSide.BUY)
     
     def test_limit_buy_order_resting(self):
@@ -389,8 +483,8 @@ class TestMatchingEngine(unittest.TestCase):
             symbol="BTC-USDT",
             side=OrderSide.BUY,
             order_type=OrderType.LIMIT,
-            quantity=Decimal("1.0"),
-            price=Decimal("50000")  # Below best ask
+            quantity=Q1_0,
+            price=P50K  # Below best ask
         )
         
         # Process the order
@@ -398,8 +492,8 @@ class TestMatchingEngine(unittest.TestCase):
         
         # Verify the order was not filled and is resting on the book
         self.assertEqual(result_order.status, OrderStatus.OPEN)
-        self.assertEqual(result_order.filled_quantity, Decimal("0"))
-        self.assertEqual(result_order.remaining_quantity, Decimal("1.0"))
+        self.assertEqual(result_order.filled_quantity, Q0)
+        self.assertEqual(result_order.remaining_quantity, Q1_0)
         
         # Verify no trades were created
         self.assertEqual(len(trades), 0)
@@ -407,8 +501,8 @@ class TestMatchingEngine(unittest.TestCase):
         # Verify the order book was updated
         order_book = self.engine.get_order_book("BTC-USDT")
         best_bid = order_book.get_best_bid()
-        self.assertEqual(best_bid[0], Decimal("50000"))
-        self.assertEqual(best_bid[1], Decimal("1.0"))
+        self.assertEqual(best_bid[0], P50K)
+        self.assertEqual(best_bid[1], Q1_0)
     
     def test_ioc_order_partial_fill(self):
         # Create an IOC buy order
@@ -416,8 +510,8 @@ class TestMatchingEngine(unittest.TestCase):
             symbol="BTC-USDT",
             side=OrderSide.BUY,
             order_type=OrderType.IOC,
-            quantity=Decimal("2.0"),
-            price=Decimal("51000")
+            quantity=Q2_0,
+            price=P51K
         )
         
         # Process the order
@@ -425,28 +519,101 @@ class TestMatchingEngine(unittest.TestCase):
         
         # Verify the order was partially filled and the rest was cancelled
         self.assertEqual(result_order.status, OrderStatus.CANCELLED)
-        self.assertEqual(result_order.filled_quantity, Decimal("1.5"))
-        self.assertEqual(result_order.remaining_quantity, Decimal("0.5"))
+        self.assertEqual(result_order.filled_quantity, Q1_5)
+        self.assertEqual(result_order.remaining_quantity, Q0_5)
         
         # Verify a trade was created
         self.assertEqual(len(trades), 1)
         self.assertEqual(trades[0].symbol, "BTC-USDT")
-        self.assertEqual(trades[0].price, Decimal("51000"))
-        self.assertEqual(trades[0].quantity, Decimal("1.5"))
+        self.assertEqual(trades[0].price, P51K)
+        self.assertEqual(trades[0].quantity, Q1_5)
         self.assertEqual(trades[0].aggressor_side, OrderSide.BUY)
         
         # Verify the order is not on the book
         order_book = self.engine.get_order_book("BTC-USDT")
         self.assertNotIn(result_order.order_id, order_book.orders)
     
+    def test_time_priority_within_price_level(self):
+        # Queue two more asks behind the existing one at 51000
+        order_book = self.engine.get_order_book("BTC-USDT")
+        later_asks = []
+        for quantity in ("0.5", "0.7"):
+            ask = Order(
+                symbol="BTC-USDT",
+                side=OrderSide.SELL,
+                order_type=OrderType.LIMIT,
+                quantity=d(quantity),
+                price=P51K
+            )
+            ask.status = OrderStatus.OPEN
+            order_book.add_order(ask)
+            later_asks.append(ask)
+        
+        # Take the first ask and part of the second
+        market_buy = Order(
+            symbol="BTC-USDT",
+            side=OrderSide.BUY,
+            order_type=OrderType.MARKET,
+            quantity=d("1.7")
+        )
+        result_order, trades = self.engine.process_order(market_buy)
+        
+        # Makers are filled in arrival order
+        self.assertEqual(len(trades), 2)
+        self.assertEqual(trades[0].quantity, Q1_5)
+        self.assertEqual(trades[1].maker_order_id, later_asks[0].order_id)
+        self.assertEqual(trades[1].quantity, d("0.2"))
+        self.assertEqual(later_asks[0].remaining_quantity, d("0.3"))
+        self.assertEqual(later_asks[1].status, OrderStatus.OPEN)
+        
+        # Filled makers leave the book entirely
+        self.assertIsNone(order_book.get_order(trades[0].maker_order_id))
+        
+        best_ask = order_book.get_best_ask()
+        self.assertEqual(best_ask[0], P51K)
+        self.assertEqual(best_ask[1], Q1_0)
+    
+    def test_cancelled_order_is_skipped_when_matching(self):
+        # Queue two more asks at 51000 and cancel the first of them
+        order_book = self.engine.get_order_book("BTC-USDT")
+        asks = []
+        for quantity in ("0.5", "0.7"):
+            ask = Order(
+                symbol="BTC-USDT",
+                side=OrderSide.SELL,
+                order_type=OrderType.LIMIT,
+                quantity=d(quantity),
+                price=P51K
+            )
+            ask.status = OrderStatus.OPEN
+            order_book.add_order(ask)
+            asks.append(ask)
+        self.engine.cancel_order(asks[0].order_id, "BTC-USDT")
+        self.assertEqual(order_book.get_best_ask()[1], Q2_2)
+        
+        # The cancelled order is passed over without being filled
+        market_buy = Order(
+            symbol="BTC-USDT",
+            side=OrderSide.BUY,
+            order_type=OrderType.MARKET,
+            quantity=Q2_2
+        )
+        result_order, trades = self.engine.process_order(market_buy)
+        
+        self.assertEqual(result_order.status, OrderStatus.FILLED)
+        self.assertEqual([trade.price for trade in trades], [P51K, P51K])
+        self.assertEqual(trades[1].maker_order_id, asks[1].order_id)
+        self.assertEqual(asks[0].filled_quantity, Q0)
+        self.assertEqual(order_book.get_best_ask()[0], P52K)
+    
     def test_fok_order_complete_fill(self):
         # Create an FOK buy order that can be completely filled
         fok_buy = Order(
             symbol="BTC-USDT",
             side=OrderSide.BUY,
             order_type=OrderType.FOK,
-            quantity=Decimal("1.0"),
-            price=Decimal("51000")
+            quantity=Q1_0,
+            price=P51K
         )
         
         # Process the order
@@ -454,24 +621,45 @@ class TestMatchingEngine(unittest.TestCase):
         
         # Verify the order was completely filled
         self.assertEqual(result_order.status, OrderStatus.FILLED)
-        self.assertEqual(result_order.filled_quantity, Decimal("1.0"))
-        self.assertEqual(result_order.remaining_quantity, Decimal("0"))
+        self.assertEqual(result_order.filled_quantity, Q1_0)
+        self.assertEqual(result_order.remaining_quantity, Q0)
         
         # Verify a trade was created
         self.assertEqual(len(trades), 1)
         self.assertEqual(trades[0].symbol, "BTC-USDT")
-        self.assertEqual(trades[0].price, Decimal("51000"))
-        self.assertEqual(trades[0].quantity, Decimal("1.0"))
+        self.assertEqual(trades[0].price, P51K)
+        self.assertEqual(trades[0].quantity, Q1_0)
         self.assertEqual(trades[0].aggressor_side, OrderSide.BUY)
     
+    def test_fok_sell_order_complete_fill(self):
+        # Create an FOK sell order that the best bid can fill completely
+        # (a lower bid sits below the limit price)
+        fok_sell = Order(
+            symbol="BTC-USDT",
+            side=OrderSide.SELL,
+            order_type=OrderType.FOK,
+            quantity=Q1_0,
+            price=P49K
+        )
+        
+        # Process the order
+        result_order, trades = self.engine.process_order(fok_sell)
+        
+        # Verify the order was completely filled at the best bid
+        self.assertEqual(result_order.status, OrderStatus.FILLED)
+        self.assertEqual(len(trades), 1)
+        self.assertEqual(trades[0].price, P49K)
+        self.assertEqual(trades[0].quantity, Q1_0)
+        self.assertEqual(trades[0].aggressor_side, OrderSide.SELL)
+    
     def test_fok_order_no_fill(self):
         # Create an FOK buy order that cannot be completely filled
         fok_buy = Order(
             symbol="BTC-USDT",
             side=OrderSide.BUY,
             order_type=OrderType.FOK,
-            quantity=Decimal("3.0"),  # More than available at 51000
-            price=Decimal("51000")
+            quantity=Q3_0,  # More than available at 51000
+            price=P51K
         )
         
         # Process the order
@@ -479,8 +667,8 @@ class TestMatchingEngine(unittest.TestCase):
         
         # Verify the order was cancelled
         self.assertEqual(result_order.status, OrderStatus.CANCELLED)
-        self.assertEqual(result_order.filled_quantity, Decimal("0"))
-        self.assertEqual(result_order.remaining_quantity, Decimal("3.0"))
+        self.assertEqual(result_order.filled_quantity, Q0)
+        self.assertEqual(result_order.remaining_quantity, Q3_0)
         
         # Verify no trades were created
         self.assertEqual(len(trades), 0)
@@ -488,8 +676,31 @@ class TestMatchingEngine(unittest.TestCase):
         # Verify the order book was not changed
         order_book = self.engine.get_order_book("BTC-USDT")
         best_ask = order_book.get_best_ask()
-        self.assertEqual(best_ask[0], Decimal("51000"))
-        self.assertEqual(best_ask[1], Decimal("1.5"))
+        self.assertEqual(best_ask[0], P51K)
+        self.assertEqual(best_ask[1], Q1_5)
+    
+    def test_fok_order_fill_across_levels(self):
+        # Create an FOK buy order that needs both ask levels to fill
+        fok_buy = Order(
+            symbol="BTC-USDT",
+            side=OrderSide.BUY,
+            order_type=OrderType.FOK,
+            quantity=Q3_0,
+            price=P52K
+        )
+        
+        # Process the order
+        result_order, trades = self.engine.process_order(fok_buy)
+        
+        # Verify the order was filled from the best ask first
+        self.assertEqual(result_order.status, OrderStatus.FILLED)
+        self.assertEqual(len(trades), 2)
+        self.assertEqual((trades[0].price, trades[0].quantity), (P51K, Q1_5))
+        self.assertEqual((trades[1].price, trades[1].quantity), (P52K, Q1_5))
+        
+        # Verify the rest of the second level is still on the book
+        order_book = self.engine.get_order_book("BTC-USDT")
+        self.assertEqual(order_book.get_best_ask(), (P52K, Q1_0))
     
     def test_cancel_order(self):
         # Add a limit order to cancel
@@ -497,8 +708,8 @@ class TestMatchingEngine(unittest.TestCase):
             symbol="BTC-USDT",
             side=OrderSide.BUY,
             order_type=OrderType.LIMIT,
-            quantity=Decimal("1.0"),
-            price=Decimal("47000")
+            quantity=Q1_0,
+            price=P47K
         )
         limit_buy.status = OrderStatus.OPEN
         
@@ -514,6 +725,97 @@ class TestMatchingEngine(unittest.TestCase):
         
         # Verify the order is not in the book
         self.assertNotIn(limit_buy.order_id, order_book.orders)
+    
+    def test_cancel_filled_order(self):
+        # Fill the resting sell order at 51000 with a market buy
+        order_book = self.engine.get_order_book("BTC-USDT")
+        maker_id = order_book.asks.peekitem(0)[1].get_oldest_order().order_id
+        market_buy = Order(
+            symbol="BTC-USDT",
+            side=OrderSide.BUY,
+            order_type=OrderType.MARKET,
+            quantity=Q1_5
+        )
+        self.engine.process_order(market_buy)
+        
+        # Cancelling the filled order reports it as filled
+        cancelled_order = self.engine.cancel_order(maker_id, "BTC-USDT")
+        self.assertIsNotNone(cancelled_order)
+        self.assertEqual(cancelled_order.status, OrderStatus.FILLED)
+        self.assertEqual(cancelled_order.remaining_quantity, Q0)
+        
+        # Verify the book was not changed
+        self.assertEqual(order_book.get_best_ask(), (P52K, Q2_5))
+    
+    def test_trade_history(self):
+        # Take both asks with two market orders
+        for quantity in ("1.5", "2.5"):
+            self.engine.process_order(Order(
+                symbol="BTC-USDT",
+                side=OrderSide.BUY,
+                order_type=OrderType.MARKET,
+                quantity=d(quantity)
+            ))
+        
+        # Most recent trades come first
+        trades = self.engine.get_trades("BTC-USDT")
+        self.assertEqual([trade.price for trade in trades], [P52K, P51K])
+        
+        # Pagination skips `offset` trades and returns at most `limit`
+        trades = self.engine.get_trades("BTC-USDT", limit=1, offset=1)
+        self.assertEqual(len(trades), 1)
+        self.assertEqual(trades[0].price, P51K)
+        
+        self.assertEqual(self.engine.get_trades("ETH-USDT"), [])
+    
+    def test_trade_history_is_kept_per_symbol(self):
+        self.engine.MAX_TRADE_HISTORY = 2
+        
+        # One BTC trade, followed by more ETH trades than the history holds
+        self.engine.process_order(Order(
+            symbol="BTC-USDT",
+            side=OrderSide.BUY,
+            order_type=OrderType.MARKET,
+            quantity=Q1_0
+        ))
+        for _ in range(5):
+            for side in (OrderSide.SELL, OrderSide.BUY):
+                self.engine.process_order(Order(
+                    symbol="ETH-USDT",
+                    side=side,
+                    order_type=OrderType.LIMIT,
+                    quantity=Q1_0,
+                    price=d("3000")
+                ))
+        
+        # The BTC trade is not pushed out by ETH volume
+        trades = self.engine.get_trades("BTC-USDT")
+        self.assertEqual(len(trades), 1)
+        self.assertEqual(trades[0].price, P51K)
+        self.assertEqual(len(self.engine.get_trades("ETH-USDT")), 2)
+    
+    def test_trade_listeners(self):
+        batches = []
+        single_trades = []
+        self.engine.add_trade_batch_listener(batches.append)
+        self.engine.add_trade_listener(single_trades.append)
+        
+        # A market order sweeping both asks produces one batch of two trades
+        market_buy = Order(
+            symbol="BTC-USDT",
+            side=OrderSide.BUY,
+            order_type=OrderType.MARKET,
+            quantity=Q3_0
+        )
+        _, trades = self.engine.process_order(market_buy)
+        
+        self.assertEqual(batches, [trades])
+        self.assertEqual(single_trades, trades)
+        
+        # Removed listeners are no longer notified
+        self.engine.remove_trade_listener(batches.append)
+        self.engine.remove_trade_listener(single_trades.append)
+        self.assertEqual(self.engine.trade_listeners, ())
 
 
 if __name__ == "__main__":
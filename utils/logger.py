@@ -1,23 +1,45 @@
+import atexit
 import logging
 import os
+import queue
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+# Console output is opt-in (ENGINE_LOG_CONSOLE=1); by default records only go to files
+LOG_TO_CONSOLE = bool(os.getenv("ENGINE_LOG_CONSOLE"))
+
+# Formatter shared by every handler
+formatter = logging.Formatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+# A single queue and background thread carry every logger's records to its handlers
+_log_queue = queue.SimpleQueue()
+_listener = QueueListener(_log_queue, respect_handler_level=True)
+_listener.start()
+atexit.register(_listener.stop)  # Flush queued records on interpreter exit
 
 # Configure logging
-def setup_logger(name, log_file=None, level=logging.INFO):
+def setup_logger(name, log_file=None, level=logging.INFO, console=None):
     """Set up and return a logger with the given name and configuration."""
     logger = logging.getLogger(name)
+    
+    # Loggers are process-wide, so configure each one only once
+    if logger.handlers:
+        return logger
+    
     logger.setLevel(level)
+    if console is None:
+        console = LOG_TO_CONSOLE
     
-    # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    handlers = []
     
-    # Add console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    # Add console handler if enabled
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
     
     # Add file handler if log_file is provided
     if log_file:
@@ -26,9 +48,20 @@ def setup_logger(name, log_file=None, level=logging.INFO):
         if log_dir and not os.path.exists(log_dir):
             os.makedirs(log_dir)
             
-        file_handler = logging.FileHandler(log_file)
+        # Open the file on the first record rather than at import
+        file_handler = logging.FileHandler(log_file, delay=True)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    # The listener sees every logger's records, so each handler only takes this logger's
+    for handler in handlers:
+        handler.addFilter(logging.Filter(name))
+    
+    # Queue records and let the background thread do the console/file I/O, so logging
+    # never blocks the event loop or the matching engine. The listener reads its
+    # handlers tuple for each record, so it is extended by rebinding
+    _listener.handlers = _listener.handlers + tuple(handlers)
+    logger.addHandler(QueueHandler(_log_queue))
     
     return logger
 
@@ -40,22 +73,30 @@ trade_logger = setup_logger('trades', 'logs/trades.log')
 def log_order(order, action):
     """Log order-related actions."""
     engine_logger.info(
-        f"Order {action}: ID={order.order_id}, Symbol={order.symbol}, "
-        f"Type={order.order_type.value}, Side={order.side.value}, "
-        f"Quantity={order.quantity}, Price={order.price}, Status={order.status.value}"
+        "Order %s: ID=%s, Symbol=%s, Type=%s, Side=%s, Quantity=%s, Price=%s, Status=%s",
+        action, order.order_id, order.symbol, order.order_type.value, order.side.value,
+        order.quantity, order.price, order.status.value
     )
 
 def log_trade(trade):
     """Log trade executions."""
+    # The quantity is built on access, so skip the formatting work when filtered out
+    if not trade_logger.isEnabledFor(logging.INFO):
+        return
+    
     trade_logger.info(
-        f"Trade executed: ID={trade.trade_id}, Symbol={trade.symbol}, "
-        f"Price={trade.price}, Quantity={trade.quantity}, "
-        f"Maker={trade.maker_order_id}, Taker={trade.taker_order_id}, "
-        f"Aggressor={trade.aggressor_side.value}"
+        "Trade executed: ID=%s, Symbol=%s, Price=%s, Quantity=%s, Maker=%s, Taker=%s, Aggressor=%s",
+        trade.trade_id, trade.symbol, trade.price, trade.quantity,
+        trade.maker_order_id, trade.taker_order_id, trade.aggressor_side.value
     )
 
 def log_api_request(method, endpoint, params=None, status_code=None):
     """Log API requests."""
-    api_logger.info(
-        f"API {method} {endpoint} - Params: {params} - Status: {status_code}"
-    )
\ No newline at end of file
+    if not api_logger.isEnabledFor(logging.INFO):
+        return
+    
+    # Request models are only serialized when the record is actually emitted
+    if hasattr(params, "model_dump_json"):
+        params = params.model_dump_json()
+    
+    api_logger.info("API %s %s - Params: %s - Status: %s", method, endpoint, params, status_code)
\ No newline at end of file